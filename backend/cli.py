@@ -6,9 +6,32 @@ import os
 
 from src.agentic_rag.core.config import settings
 from src.agentic_rag.services.data_pipeline import DataPreparationPipeline
+from src.agentic_rag.services.embedding_cache import EmbeddingCache
 
 
-def process_documents(documents_path: str, clear_existing: bool = False):
+def create_pipeline() -> DataPreparationPipeline:
+    """Create a data pipeline configured like the API server's."""
+    return DataPreparationPipeline(
+        vector_store_path=settings.vector_store_path,
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap,
+        embedding_model=settings.embedding_model,
+        embedding_batch_size=settings.embedding_batch_size,
+        embedding_cache=(
+            EmbeddingCache(settings.embedding_cache_path)
+            if settings.embedding_cache_path
+            else None
+        ),
+        # Only applied when the collection is created, e.g. by process --clear
+        hnsw_config=settings.hnsw_config,
+        write_batch_size=settings.write_batch_size,
+        pdf_workers=settings.pdf_workers,
+    )
+
+
+def process_documents(
+    documents_path: str, clear_existing: bool = False, workers: int = 1
+):
     """Process documents and add them to vector store."""
     if not os.path.exists(documents_path):
         print(f"Error: Documents path does not exist: {documents_path}")
@@ -16,18 +39,16 @@ def process_documents(documents_path: str, clear_existing: bool = False):
 
     print(f"Processing documents from: {documents_path}")
     print(f"Clear existing store: {clear_existing}")
+    print(f"Workers: {workers}")
 
     # Initialize data pipeline
-    pipeline = DataPreparationPipeline(
-        vector_store_path=settings.vector_store_path,
-        chunk_size=settings.chunk_size,
-        chunk_overlap=settings.chunk_overlap,
-        embedding_model=settings.embedding_model,
-    )
+    pipeline = create_pipeline()
 
     try:
         chunks_processed = pipeline.process_documents(
-            documents_path=documents_path, clear_existing=clear_existing
+            documents_path=documents_path,
+            clear_existing=clear_existing,
+            workers=workers,
         )
 
         print(f"Successfully processed {chunks_processed} document chunks")
@@ -44,7 +65,7 @@ def process_documents(documents_path: str, clear_existing: bool = False):
 
 def show_store_info():
     """Show vector store information."""
-    pipeline = DataPreparationPipeline(vector_store_path=settings.vector_store_path)
+    pipeline = create_pipeline()
 
     stats = pipeline.get_store_stats()
 
@@ -76,6 +97,12 @@ def main():
         action="store_true",
         help="Clear existing vector store before processing",
     )
+    process_parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(1, (os.cpu_count() or 1) - 1),
+        help="Number of processes used to load and chunk documents",
+    )
 
     # Info command
     info_parser = subparsers.add_parser(
@@ -85,7 +112,7 @@ def main():
     args = parser.parse_args()
 
     if args.command == "process":
-        process_documents(args.documents_path, args.clear)
+        process_documents(args.documents_path, args.clear, args.workers)
     elif args.command == "info":
         show_store_info()
     else:
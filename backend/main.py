@@ -1,12 +1,22 @@
+import asyncio
+import threading
 import uvicorn
+from contextlib import asynccontextmanager
 from pathlib import Path
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 from src.agentic_rag.core.config import settings
 from src.agentic_rag.services.agent import AgenticChatBot
+from src.agentic_rag.services.batcher import DynamicBatcher
+from src.agentic_rag.services.bulk_writer import BulkWriter
 from src.agentic_rag.services.data_pipeline import DataPreparationPipeline
+from src.agentic_rag.services.embedding_cache import EmbeddingCache
 from src.agentic_rag.services.file_processor import FileProcessor
+from src.agentic_rag.services.text_splitter import TextChunker
 from src.agentic_rag.api import routes
 from src.agentic_rag.api import auth_routes
 
@@ -19,6 +29,8 @@ def create_app() -> FastAPI:
         version=settings.app_version,
         debug=settings.debug,
         description="INKSight - AI-powered document assistant with Vector Search and LLM Chat",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     # Add CORS middleware
@@ -30,6 +42,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Compress larger JSON payloads (search results, sources); small ones stay as is
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
     # Include API routes
     app.include_router(routes.router, prefix="/api/v1")
     app.include_router(auth_routes.router, prefix="/api/v1/auth", tags=["auth"])
@@ -44,12 +59,34 @@ def initialize_services():
     Path(settings.vector_store_path).mkdir(parents=True, exist_ok=True)
     Path(settings.documents_path).mkdir(parents=True, exist_ok=True)
 
+    # Initialize persistent embedding cache
+    embedding_cache = (
+        EmbeddingCache(settings.embedding_cache_path)
+        if settings.embedding_cache_path
+        else None
+    )
+
+    hnsw_config = settings.hnsw_config
+
     # Initialize data pipeline
     routes.data_pipeline = DataPreparationPipeline(
         vector_store_path=settings.vector_store_path,
         chunk_size=settings.chunk_size,
         chunk_overlap=settings.chunk_overlap,
         embedding_model=settings.embedding_model,
+        embedding_batch_size=settings.embedding_batch_size,
+        embedding_cache=embedding_cache,
+        hnsw_config=hnsw_config,
+        write_batch_size=settings.write_batch_size,
+        pdf_workers=settings.pdf_workers,
+    )
+    routes.data_pipeline.vector_store.initialize_store()
+
+    # Batch uploaded chunks into fewer vector store writes
+    routes.bulk_writer = BulkWriter(
+        routes.data_pipeline.vector_store,
+        max_batch=settings.write_batch_size,
+        max_delay=settings.write_batch_max_delay,
     )
 
     # Initialize chatbot
@@ -60,17 +97,41 @@ def initialize_services():
         temperature=settings.temperature,
         max_tokens=settings.max_tokens,
         langsmith_project=settings.langsmith_project,
+        query_cache_size=settings.query_cache_size,
+        results_cache_size=settings.retrieval_cache_size,
+        results_cache_ttl=settings.retrieval_cache_ttl_seconds,
+        debug=settings.debug,
+        hnsw_config=hnsw_config,
+        history_turns=settings.chat_history_turns,
+        history_max_tokens=settings.chat_history_max_tokens,
+        provider_sort=settings.openrouter_provider_sort,
+        max_concurrent_chats=settings.max_concurrent_chats,
     )
 
-    # Initialize file processor
+    # Group concurrent knowledge base searches into batches
+    routes.search_batcher = DynamicBatcher(
+        routes.chatbot.search_knowledge_base_batch,
+        max_batch_size=settings.search_batch_size,
+        max_delay=settings.search_batch_max_delay,
+    )
+
+    # Initialize file processor and upload chunker
     routes.file_processor = FileProcessor()
+    routes.text_chunker = TextChunker(
+        chunk_size=settings.chunk_size, chunk_overlap=settings.chunk_overlap
+    )
 
     print("Services initialized successfully")
     print(f"Vector store: {settings.vector_store_path}")
     print(f"Documents path: {settings.documents_path}")
     print(f"Model: {settings.model_name}")
     print(f"Reranker enabled: {settings.enable_reranker}")
-    print(f"File upload: {FileProcessor.MAX_FILE_SIZE / (1024*1024):.0f}MB")
+    print(f"Embedding cache: {settings.embedding_cache_path or 'disabled'}")
+    print(f"File upload: {routes.MAX_FILE_SIZE_MB:.0f}MB ({routes.SUPPORTED_EXTENSIONS_STR})")
+
+
+# Set at shutdown; startup ingestion stops at its next file or batch boundary
+ingest_stop = threading.Event()
 
 
 def process_existing_documents():
@@ -88,37 +149,76 @@ def process_existing_documents():
 
         try:
             chunks_processed = routes.data_pipeline.process_documents(
-                documents_path=str(docs_path), clear_existing=False
+                documents_path=str(docs_path),
+                clear_existing=False,
+                workers=settings.ingest_workers,
+                stop_event=ingest_stop,
             )
-            print(f"Processed {chunks_processed} document chunks")
+            if ingest_stop.is_set():
+                print(f"Document ingestion interrupted at shutdown after {chunks_processed} chunks")
+            else:
+                print(f"Processed {chunks_processed} document chunks")
         except Exception as e:
             print(f"Error processing documents: {e}")
     else:
         print(f"No documents found in {docs_path}")
 
 
-# Create the FastAPI app
-app = create_app()
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services when the app starts."""
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services on startup and ingest documents in the background."""
     print("🚀 Starting INKSight...")
 
+    # Size the thread pool used for blocking chatbot and vector store calls
+    to_thread.current_default_thread_limiter().total_tokens = settings.thread_pool_size
+
     # Initialize services
     initialize_services()
 
-    # Process any existing documents
-    process_existing_documents()
+    # Run the embedding model and vector store once before taking traffic
+    if settings.warmup_on_startup:
+        try:
+            await to_thread.run_sync(routes.chatbot.warm_up)
+            print("Retrieval warmed up")
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+
+    await routes.bulk_writer.start()
+    await routes.search_batcher.start()
+
+    # Process any existing documents without holding up the server
+    ingest_stop.clear()
+    routes.ingest_task = asyncio.create_task(
+        asyncio.to_thread(process_existing_documents)
+    )
 
     print("✅ System ready!")
 
+    yield
+
+    # The ingestion thread can't be cancelled; ask it to stop and wait for it
+    ingest_stop.set()
+    done, _ = await asyncio.wait(
+        {routes.ingest_task}, timeout=settings.ingest_shutdown_timeout_seconds
+    )
+    if not done:
+        print("Document ingestion is still finishing its current file; shutdown waits for it")
+    await routes.bulk_writer.stop()
+    await routes.search_batcher.stop()
+
+
+# Create the FastAPI app
+app = create_app()
+
 
 @app.get("/")
 async def root():
     """Root endpoint with system information."""
-    store_info = routes.chatbot.get_knowledge_base_info() if routes.chatbot else {}
+    store_info = (
+        await to_thread.run_sync(routes.chatbot.get_knowledge_base_info)
+        if routes.chatbot
+        else {}
+    )
 
     return {
         "message": "INKSight API",
@@ -129,17 +229,27 @@ async def root():
             "chat": "/api/v1/chat",
             "search": "/api/v1/search",
             "upload": "/api/v1/upload",
+            "upload_batch": "/api/v1/upload-batch",
             "process_documents": "/api/v1/process-documents",
             "store_info": "/api/v1/store-info",
             "clear_memory": "/api/v1/clear-memory",
             "supported_formats": "/api/v1/supported-formats",
             "health": "/api/v1/health",
+            "readiness": "/api/v1/health/ready",
         },
         "knowledge_base": store_info,
     }
 
 
 if __name__ == "__main__":
+    # uvicorn[standard] brings uvloop and httptools, which "auto" picks up.
+    # Reload mode only supports a single worker.
     uvicorn.run(
-        "main:app", host=settings.host, port=settings.port, reload=settings.debug
+        "main:app",
+        host=settings.host,
+        port=settings.port,
+        reload=settings.debug,
+        workers=1 if settings.debug else settings.workers,
+        loop="auto",
+        http="auto",
     )
@@ -1,12 +1,16 @@
 from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPAuthorizationCredentials
 
 from .models import UserLogin, Token, User
 from ..core.auth import (
     authenticate_user,
     create_access_token,
     get_current_active_user,
+    optional_security,
+    revoke_token,
 )
 from ..core.config import settings
 
@@ -15,7 +19,10 @@ router = APIRouter()
 @router.post("/login", response_model=Token)
 async def login_user(user_credentials: UserLogin):
     """Authenticate user and return access token."""
-    user = authenticate_user(user_credentials.username, user_credentials.password)
+    # bcrypt verification is deliberately slow; keep it off the event loop
+    user = await run_in_threadpool(
+        authenticate_user, user_credentials.username, user_credentials.password
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,6 +48,13 @@ async def read_users_me(current_user: dict = Depends(get_current_active_user)):
     )
 
 @router.post("/logout")
-async def logout_user():
-    """Logout user (client should delete token)."""
-    return JSONResponse(content={"message": "Successfully logged out"})
\ No newline at end of file
+async def logout_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+):
+    """Logout user and revoke the presented token (client should still delete it).
+
+    Invalid or expired tokens are ignored; there is nothing to revoke.
+    """
+    if credentials is not None:
+        revoke_token(credentials.credentials)
+    return {"message": "Successfully logged out"}
\ No newline at end of file
@@ -1,11 +1,18 @@
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 
+# Shared config for incoming request bodies: trim stray whitespace around
+# strings and ignore unknown fields from clients.
+REQUEST_MODEL_CONFIG = ConfigDict(str_strip_whitespace=True, extra="ignore")
+
+
 class ChatMessage(BaseModel):
     """Chat message model."""
 
+    model_config = REQUEST_MODEL_CONFIG
+
     message: str = Field(..., description="The user message")
     include_sources: bool = Field(
         default=False,
@@ -25,6 +32,8 @@ class ChatResponse(BaseModel):
 class SearchRequest(BaseModel):
     """Knowledge base search request."""
 
+    model_config = REQUEST_MODEL_CONFIG
+
     query: str = Field(..., description="Search query")
     k: int = Field(default=4, ge=1, le=20,
                    description="Number of results to return")
@@ -43,6 +52,8 @@ class SearchResponse(BaseModel):
 class ProcessDocumentsRequest(BaseModel):
     """Request to process documents."""
 
+    model_config = REQUEST_MODEL_CONFIG
+
     documents_path: str = Field(..., description="Path to documents directory")
     clear_existing: bool = Field(
         default=False, description="Whether to clear existing vector store"
@@ -50,11 +61,12 @@ class ProcessDocumentsRequest(BaseModel):
 
 
 class ProcessDocumentsResponse(BaseModel):
-    """Response from document processing."""
+    """Status of a background document processing job."""
 
-    success: bool
-    message: str
-    chunks_processed: int
+    job_id: str
+    status: str = Field(..., description="One of: queued, running, completed, failed")
+    message: str = ""
+    chunks_processed: int = 0
 
 
 class StoreInfoResponse(BaseModel):
@@ -1,8 +1,16 @@
-import os
-from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Depends
-from fastapi.responses import JSONResponse
+import asyncio
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from cachetools import TTLCache, cached
+from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
 import logging
 
+from langchain.schema import Document
+
 from .models import (
     ChatMessage,
     ChatResponse,
@@ -14,10 +22,13 @@ from .models import (
     UploadDocumentResponse,
 )
 from ..services.agent import AgenticChatBot
+from ..services.batcher import DynamicBatcher
+from ..services.bulk_writer import BulkWriter
 from ..services.data_pipeline import DataPreparationPipeline
-from ..services.file_processor import FileProcessor
+from ..services.file_processor import FileProcessor, FileTooLargeError
 from ..services.text_splitter import TextChunker
 from ..core.auth import get_current_active_user
+from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -26,68 +37,206 @@ router = APIRouter()
 chatbot: AgenticChatBot = None
 data_pipeline: DataPreparationPipeline = None
 file_processor: FileProcessor = None
+text_chunker: TextChunker = None
+bulk_writer: BulkWriter = None
+search_batcher: DynamicBatcher = None
+
+# Startup ingestion of existing documents, set by the app lifespan
+ingest_task: Optional[asyncio.Task] = None
+
+# Background document processing jobs, keyed by job id (per process). Queued
+# and running jobs are held until they finish, then kept for the retention
+# period; only finished jobs are dropped when that cache fills up.
+active_jobs: Dict[str, ProcessDocumentsResponse] = {}
+finished_jobs: TTLCache = TTLCache(
+    maxsize=1024, ttl=settings.processing_job_retention_seconds
+)
+# Written from the threads running jobs as well as the event loop
+processing_jobs_lock = threading.Lock()
+
+# /process-documents may only read from inside the configured documents directory
+DOCUMENTS_ROOT = Path(settings.documents_path).resolve()
+
+# Upload limits are fixed for the process lifetime, so format them once
+SUPPORTED_EXTENSIONS = tuple(FileProcessor.get_supported_extensions())
+SUPPORTED_EXTENSIONS_STR = ", ".join(SUPPORTED_EXTENSIONS)
+MAX_FILE_SIZE_MB = FileProcessor.MAX_FILE_SIZE / (1024 * 1024)
+SUPPORTED_FORMATS = {
+    "supported_extensions": SUPPORTED_EXTENSIONS,
+    "max_file_size_mb": MAX_FILE_SIZE_MB,
+}
+
+
+def get_chatbot() -> AgenticChatBot:
+    """Dependency returning the chatbot set up at startup."""
+    if chatbot is None:
+        raise HTTPException(status_code=503, detail="Chatbot service unavailable")
+    return chatbot
+
+
+def get_data_pipeline() -> DataPreparationPipeline:
+    """Dependency returning the data pipeline set up at startup."""
+    if data_pipeline is None:
+        raise HTTPException(status_code=503, detail="Data pipeline unavailable")
+    return data_pipeline
+
+
+def get_file_processor() -> FileProcessor:
+    """Dependency returning the upload file processor set up at startup."""
+    if file_processor is None:
+        raise HTTPException(status_code=503, detail="File processor unavailable")
+    return file_processor
+
+
+def get_text_chunker() -> TextChunker:
+    """Dependency returning the upload text chunker set up at startup."""
+    if text_chunker is None:
+        raise HTTPException(status_code=503, detail="Text chunker unavailable")
+    return text_chunker
+
+
+def get_bulk_writer() -> BulkWriter:
+    """Dependency returning the batched vector store writer set up at startup."""
+    if bulk_writer is None:
+        raise HTTPException(status_code=503, detail="Vector store writer unavailable")
+    return bulk_writer
+
+
+def get_search_batcher() -> DynamicBatcher:
+    """Dependency returning the batched knowledge base search set up at startup."""
+    if search_batcher is None:
+        raise HTTPException(status_code=503, detail="Search service unavailable")
+    return search_batcher
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatMessage, current_user: dict = Depends(get_current_active_user)):
-    if not chatbot:
-        raise HTTPException(status_code=500, detail="Service unavailable")
+async def chat_endpoint(
+    request: ChatMessage,
+    http_request: Request,
+    bot: AgenticChatBot = Depends(get_chatbot),
+    current_user: dict = Depends(get_current_active_user),
+):
+    # Clients asking for an event stream get tokens as they are generated
+    # (text only, no sources); everyone else gets the JSON ChatResponse.
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        return StreamingResponse(
+            _chat_events(bot, request.message),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
     try:
-        response = chatbot.chat(request.message)
-        result = ChatResponse(response=response)
-        if request.include_sources:
-            kb_info = chatbot.search_knowledge_base(request.message)
-            if "results" in kb_info:
-                result.sources = kb_info["results"]
-        return result
+        # LLM round-trips are awaited; the retrieval tool runs in an executor
+        result = await bot.achat(request.message, return_sources=request.include_sources)
+        return ChatResponse(response=result.response, sources=result.sources)
     except Exception:
         raise HTTPException(status_code=500, detail="Unable to process your request. Please try again.")
 
 
+async def _chat_events(bot: AgenticChatBot, message: str):
+    """Format streamed chat tokens as server-sent events."""
+    async for token in bot.astream_chat(message):
+        # Multi-line tokens become multiple data lines, rejoined by the client
+        data = "\n".join(f"data: {line}" for line in token.split("\n"))
+        yield f"{data}\n\n"
+    yield "event: done\ndata: [DONE]\n\n"
+
+
 @router.post("/search", response_model=SearchResponse)
-async def search_knowledge_base(request: SearchRequest, current_user: dict = Depends(get_current_active_user)):
-    if not chatbot:
-        raise HTTPException(status_code=500, detail="Service unavailable")
+async def search_knowledge_base(
+    request: SearchRequest,
+    batcher: DynamicBatcher = Depends(get_search_batcher),
+    current_user: dict = Depends(get_current_active_user),
+):
     try:
-        results = chatbot.search_knowledge_base(query=request.query, k=request.k)
+        # Concurrent searches share one embedding pass and vector query
+        results = await batcher.submit((request.query, request.k))
         if "error" in results:
             raise HTTPException(status_code=400, detail="Search failed")
-        return SearchResponse(**results)
+        # Built by the chatbot in SearchResponse's shape; skip re-validating it
+        return ORJSONResponse(results)
     except Exception:
         raise HTTPException(status_code=500, detail="Search unavailable. Please try again.")
 
 
-@router.post("/process-documents", response_model=ProcessDocumentsResponse)
-async def process_documents(request: ProcessDocumentsRequest, current_user: dict = Depends(get_current_active_user)):
-    if not data_pipeline:
-        raise HTTPException(status_code=500, detail="Service unavailable")
-    if not os.path.exists(request.documents_path):
+@router.post("/process-documents", response_model=ProcessDocumentsResponse, status_code=202)
+async def process_documents(
+    request: ProcessDocumentsRequest,
+    background_tasks: BackgroundTasks,
+    pipeline: DataPreparationPipeline = Depends(get_data_pipeline),
+    current_user: dict = Depends(get_current_active_user),
+):
+    documents_dir = _resolve_documents_dir(request.documents_path)
+    if documents_dir is None:
         raise HTTPException(status_code=400, detail="Documents path does not exist")
+    if not documents_dir.is_relative_to(DOCUMENTS_ROOT):
+        raise HTTPException(status_code=403, detail="Documents path is outside the documents directory")
+
+    job = ProcessDocumentsResponse(
+        job_id=str(uuid.uuid4()),
+        status="queued",
+        message=f"Processing of {request.documents_path} queued",
+    )
+    with processing_jobs_lock:
+        active_jobs[job.job_id] = job
+    # Ingest the path that was checked, not the request's, so a symlink
+    # swapped after validation can't point the job elsewhere
+    background_tasks.add_task(
+        _run_processing_job, pipeline, job, documents_dir, request.clear_existing
+    )
+    return job
+
+
+@router.get("/process-documents/{job_id}", response_model=ProcessDocumentsResponse)
+async def get_processing_job(job_id: str, current_user: dict = Depends(get_current_active_user)):
+    with processing_jobs_lock:
+        job = active_jobs.get(job_id) or finished_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@cached(TTLCache(maxsize=256, ttl=5))
+def _resolve_documents_dir(documents_path: str) -> Optional[Path]:
+    """Resolve a requested documents directory, or None if it is not a directory.
+
+    Results are cached briefly so repeated ingestion requests for the same
+    directory don't stat the filesystem every time.
+    """
+    path = Path(documents_path).resolve()
+    return path if path.is_dir() else None
+
+
+def _run_processing_job(
+    pipeline: DataPreparationPipeline,
+    job: ProcessDocumentsResponse,
+    documents_dir: Path,
+    clear_existing: bool,
+) -> None:
+    """Run document ingestion for a queued job and record its outcome."""
+    job.status = "running"
     try:
-        chunks_processed = data_pipeline.process_documents(
-            documents_path=request.documents_path,
-            clear_existing=request.clear_existing,
-        )
-        return ProcessDocumentsResponse(
-            success=True,
-            message=f"Successfully processed documents from {request.documents_path}",
-            chunks_processed=chunks_processed,
+        job.chunks_processed = pipeline.process_documents(
+            documents_path=str(documents_dir),
+            clear_existing=clear_existing,
+            workers=settings.ingest_workers,
         )
+        job.status = "completed"
+        job.message = f"Successfully processed documents from {documents_dir}"
     except Exception:
-        return ProcessDocumentsResponse(
-            success=False,
-            message="Error processing documents. Please try again.",
-            chunks_processed=0,
-        )
+        logger.exception(f"Error processing documents from {documents_dir}")
+        job.status = "failed"
+        job.message = "Error processing documents. Please try again."
+
+    with processing_jobs_lock:
+        finished_jobs[job.job_id] = job
+        active_jobs.pop(job.job_id, None)
 
 
 @router.get("/store-info", response_model=StoreInfoResponse)
-async def get_store_info():
-    if not chatbot:
-        raise HTTPException(status_code=500, detail="Service unavailable")
+async def get_store_info(bot: AgenticChatBot = Depends(get_chatbot)):
     try:
-        info = chatbot.get_knowledge_base_info()
-        store_ready = chatbot.retrieval_service.is_store_ready()
+        info, store_ready = await run_in_threadpool(_store_info, bot)
         return StoreInfoResponse(
             document_count=info.get("document_count", 0),
             reranker_enabled=info.get("reranker_enabled", False),
@@ -98,13 +247,19 @@ async def get_store_info():
         raise HTTPException(status_code=500, detail="Store information unavailable")
 
 
+def _store_info(bot: AgenticChatBot) -> Tuple[dict, bool]:
+    """Collect knowledge base info and readiness in one worker thread hop."""
+    return bot.get_knowledge_base_info(), bot.retrieval_service.is_store_ready()
+
+
 @router.delete("/clear-memory")
-async def clear_memory(current_user: dict = Depends(get_current_active_user)):
-    if not chatbot:
-        raise HTTPException(status_code=500, detail="Service unavailable")
+async def clear_memory(
+    bot: AgenticChatBot = Depends(get_chatbot),
+    current_user: dict = Depends(get_current_active_user),
+):
     try:
-        chatbot.clear_memory()
-        return JSONResponse(content={"message": "Memory cleared successfully"})
+        await bot.aclear_memory()
+        return {"message": "Memory cleared successfully"}
     except Exception:
         raise HTTPException(status_code=500, detail="Unable to clear memory")
 
@@ -112,43 +267,29 @@ async def clear_memory(current_user: dict = Depends(get_current_active_user)):
 @router.post("/upload", response_model=UploadDocumentResponse)
 async def upload_document(
     file: UploadFile = File(...), 
+    writer: BulkWriter = Depends(get_bulk_writer),
+    processor: FileProcessor = Depends(get_file_processor),
+    chunker: TextChunker = Depends(get_text_chunker),
     current_user: dict = Depends(get_current_active_user)
 ):
     logger.info(f"Upload attempt: {file.filename}, size: {file.size}")
     
-    if not data_pipeline or not file_processor:
-        logger.error("Services not initialized")
-        raise HTTPException(status_code=500, detail="Service unavailable")
-    
-    if not FileProcessor.is_supported_file(file.filename):
-        supported = FileProcessor.get_supported_extensions()
-        logger.warning(f"Unsupported file: {file.filename}, supported: {supported}")
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Unsupported file type. Supported types: {', '.join(supported)}"
-        )
+    # Reject by name and declared size before any parsing work
+    try:
+        FileProcessor.validate_header(file.filename, file.size)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        logger.warning(f"Rejected upload {file.filename}: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        # Читаем файл
-        file_bytes = await file.read()
-        logger.info(f"File read: {len(file_bytes)} bytes")
-        
-        # Обрабатываем файл
-        documents, file_info = file_processor.process_uploaded_file(
-            file_bytes=file_bytes,
-            filename=file.filename,
-            metadata={"upload_source": "api"},
-        )
-        logger.info(f"Processed: {len(documents)} documents")
-        
-        # Чанкируем
-        text_chunker = TextChunker()
-        chunks = text_chunker.chunk_documents(documents)
+        # Обрабатываем и чанкируем файл прямо из спула
+        chunks, file_info = await run_in_threadpool(_process_upload, processor, chunker, file)
         logger.info(f"Chunked: {len(chunks)} chunks")
         
-        # Добавляем в векторное хранилище
-        data_pipeline.vector_store.initialize_store()
-        data_pipeline.vector_store.add_documents(chunks)
+        # Добавляем в векторное хранилище (запись объединяется с соседними загрузками)
+        await writer.add_documents(chunks)
         logger.info(f"Stored: {len(chunks)} chunks")
         
         return UploadDocumentResponse(
@@ -170,19 +311,107 @@ async def upload_document(
         )
 
 
+@router.post("/upload-batch", response_model=List[UploadDocumentResponse])
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    writer: BulkWriter = Depends(get_bulk_writer),
+    processor: FileProcessor = Depends(get_file_processor),
+    chunker: TextChunker = Depends(get_text_chunker),
+    current_user: dict = Depends(get_current_active_user)
+):
+    logger.info(f"Batch upload attempt: {len(files)} files")
+
+    semaphore = asyncio.Semaphore(settings.upload_concurrency)
+
+    async def process(file: UploadFile) -> Tuple[List[Document], dict]:
+        # Fails fast on bad names or sizes, before waiting for a parse slot
+        FileProcessor.validate_header(file.filename, file.size)
+        async with semaphore:
+            return await run_in_threadpool(_process_upload, processor, chunker, file)
+
+    # Парсим файлы параллельно, а пишем в хранилище одним вызовом
+    results = await asyncio.gather(*(process(file) for file in files), return_exceptions=True)
+
+    all_chunks: List[Document] = []
+    responses: List[UploadDocumentResponse] = []
+    for file, result in zip(files, results):
+        if isinstance(result, Exception):
+            if isinstance(result, ValueError):
+                logger.error(f"ValueError in upload of {file.filename}: {str(result)}")
+                message = str(result)
+            else:
+                logger.error(f"Unexpected error processing {file.filename}: {str(result)}")
+                message = f"Error processing file: {str(result)}"
+            responses.append(UploadDocumentResponse(
+                success=False,
+                message=message,
+                filename=file.filename,
+                chunks_processed=0,
+                file_size_bytes=file.size or 0,
+            ))
+            continue
+
+        chunks, file_info = result
+        all_chunks.extend(chunks)
+        responses.append(UploadDocumentResponse(
+            success=True,
+            message=f"Successfully processed and uploaded {file.filename}",
+            filename=file.filename,
+            chunks_processed=len(chunks),
+            file_size_bytes=file_info["size_bytes"],
+        ))
+
+    if all_chunks:
+        try:
+            await writer.add_documents(all_chunks)
+            logger.info(f"Stored: {len(all_chunks)} chunks from {len(files)} files")
+        except Exception as e:
+            logger.exception(f"Unexpected error storing batch upload: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error storing files: {str(e)}"
+            )
+
+    return responses
+
+
+def _process_upload(
+    processor: FileProcessor, chunker: TextChunker, file: UploadFile
+) -> Tuple[List[Document], dict]:
+    """Parse and chunk an uploaded file straight from its spooled stream."""
+    file.file.seek(0)
+    documents, file_info = processor.process_uploaded_file(
+        file=file.file,
+        filename=file.filename,
+        metadata={"upload_source": "api"},
+    )
+    logger.info(f"Processed {file.filename}: {len(documents)} documents")
+    return chunker.chunk_documents(documents), file_info
+
+
 @router.get("/supported-formats")
 async def get_supported_formats():
-    return JSONResponse(content={
-        "supported_extensions": FileProcessor.get_supported_extensions(),
-        "max_file_size_mb": FileProcessor.MAX_FILE_SIZE / (1024 * 1024),
-    })
+    return SUPPORTED_FORMATS
 
 
 @router.get("/health")
 async def health_check():
-    return JSONResponse(content={
+    return {
         "status": "healthy",
         "chatbot_ready": chatbot is not None,
         "data_pipeline_ready": data_pipeline is not None,
         "file_processor_ready": file_processor is not None,
-    })
+    }
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    ingestion_complete = ingest_task is None or ingest_task.done()
+    ready = chatbot is not None and ingestion_complete
+    return ORJSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "ingestion_complete": ingestion_complete,
+        },
+    )
@@ -1,7 +1,11 @@
-import json
+import heapq
 import os
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+import orjson
+from cachetools import TTLCache
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
@@ -15,33 +19,72 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Security scheme
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Per-process cache of verified tokens: token -> (user, exp timestamp).
+# Dependencies run on the event loop thread, so no extra locking is needed.
+_token_cache: TTLCache = TTLCache(
+    maxsize=max(settings.token_cache_size, 1), ttl=settings.token_cache_ttl_seconds
+)
+
+# Tokens revoked on logout: token -> exp timestamp. Each entry is kept until
+# its token expires, with a heap of (exp, token) to purge the expired ones.
+# Revocation is per process, so with several workers a revoked token is only
+# rejected by the worker that handled the logout.
+_revoked_tokens: Dict[str, float] = {}
+_revoked_expiry: List[Tuple[float, str]] = []
 
 # Path to users database file
 USERS_DB_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "..", "users.json")
 
-def load_users_db() -> Dict[str, Dict[str, Any]]:
-    """Load users from JSON file."""
-    if not os.path.exists(USERS_DB_FILE):
-        return {}
-    
+# Parsed users database, reloaded only when the file's mtime changes
+_users_cache: Dict[str, Any] = {"mtime_ns": None, "db": {}}
+_users_lock = threading.Lock()
+
+def _users_file_mtime_ns() -> Optional[int]:
     try:
-        with open(USERS_DB_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+        return os.stat(USERS_DB_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _cached_users_db() -> Dict[str, Dict[str, Any]]:
+    """Return the parsed users database, re-reading the file only if it changed."""
+    mtime_ns = _users_file_mtime_ns()
+    with _users_lock:
+        if mtime_ns == _users_cache["mtime_ns"]:
+            return _users_cache["db"]
+
+        users_db = {}
+        if mtime_ns is not None:
+            try:
+                with open(USERS_DB_FILE, 'rb') as f:
+                    users_db = orjson.loads(f.read())
+            except (orjson.JSONDecodeError, FileNotFoundError):
+                users_db = {}
+
+        # Convert ISO strings to datetime once, at load time
+        for user in users_db.values():
+            if isinstance(user.get("created_at"), str):
+                user["created_at"] = datetime.fromisoformat(user["created_at"])
+
+        _users_cache["mtime_ns"] = mtime_ns
+        _users_cache["db"] = users_db
+        return users_db
+
+def load_users_db() -> Dict[str, Dict[str, Any]]:
+    """Load users from JSON file (a copy callers may modify)."""
+    return {username: user.copy() for username, user in _cached_users_db().items()}
 
 def save_users_db(users_db: Dict[str, Dict[str, Any]]) -> None:
     """Save users to JSON file."""
     os.makedirs(os.path.dirname(USERS_DB_FILE), exist_ok=True)
-    with open(USERS_DB_FILE, 'w') as f:
-        # Convert datetime objects to strings for JSON serialization
-        serializable_db = {}
-        for username, user_data in users_db.items():
-            serializable_user = user_data.copy()
-            if isinstance(serializable_user.get("created_at"), datetime):
-                serializable_user["created_at"] = serializable_user["created_at"].isoformat()
-            serializable_db[username] = serializable_user
-        json.dump(serializable_db, f, indent=2)
+    with _users_lock:
+        # orjson writes datetime objects as ISO 8601 strings
+        with open(USERS_DB_FILE, 'wb') as f:
+            f.write(orjson.dumps(users_db, option=orjson.OPT_INDENT_2))
+
+        _users_cache["mtime_ns"] = _users_file_mtime_ns()
+        _users_cache["db"] = {username: user.copy() for username, user in users_db.items()}
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
@@ -53,12 +96,8 @@ def get_password_hash(password: str) -> str:
 
 def get_user(username: str) -> Optional[Dict[str, Any]]:
     """Get user from database."""
-    users_db = load_users_db()
-    user = users_db.get(username)
-    if user and isinstance(user.get("created_at"), str):
-        # Convert ISO string back to datetime for internal use
-        user["created_at"] = datetime.fromisoformat(user["created_at"])
-    return user
+    user = _cached_users_db().get(username)
+    return user.copy() if user else None
 
 def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
     """Authenticate a user."""
@@ -104,6 +143,35 @@ def create_user(username: str, email: str, password: str) -> Dict[str, Any]:
     save_users_db(users_db)
     return user_data
 
+def _purge_revoked_tokens(now: float) -> None:
+    """Forget revoked tokens that have expired and are rejected anyway."""
+    while _revoked_expiry and _revoked_expiry[0][0] <= now:
+        _, token = heapq.heappop(_revoked_expiry)
+        _revoked_tokens.pop(token, None)
+
+def revoke_token(token: str) -> bool:
+    """Revoke a token so it is rejected for the rest of its lifetime.
+
+    Only tokens that verify are revoked, so the list can't be filled with
+    arbitrary strings.
+
+    Returns:
+        Whether the token was valid and is now revoked
+    """
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return False
+
+    now = time.time()
+    _purge_revoked_tokens(now)
+    expires_at = payload.get("exp") or now + settings.access_token_expire_minutes * 60
+    if token not in _revoked_tokens:
+        heapq.heappush(_revoked_expiry, (expires_at, token))
+    _revoked_tokens[token] = expires_at
+    _token_cache.pop(token, None)
+    return True
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get the current authenticated user."""
     credentials_exception = HTTPException(
@@ -112,8 +180,18 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    token = credentials.credentials
+    if token in _revoked_tokens:
+        raise credentials_exception
+
+    cached = _token_cache.get(token)
+    if cached is not None:
+        user, expires_at = cached
+        if expires_at > time.time():
+            return user
+        _token_cache.pop(token, None)
+
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         username: str = payload.get("sub")
         if username is None:
@@ -125,6 +203,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     user = get_user(username=token_data.username)
     if user is None:
         raise credentials_exception
+
+    expires_at = payload.get("exp")
+    if settings.token_cache_size > 0 and expires_at is not None:
+        _token_cache[token] = (user, expires_at)
     return user
 
 async def get_current_active_user(current_user: Dict[str, Any] = Depends(get_current_user)):
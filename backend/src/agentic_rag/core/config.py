@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
 
@@ -21,6 +21,14 @@ class Settings(BaseSettings):
     model_name: str = Field(default="qwen/qwen3-235b-a22b:free")
     temperature: float = Field(default=0.1, ge=0.0, le=2.0)
     max_tokens: int = Field(default=2000, gt=0)
+    # OpenRouter upstream provider ordering: throughput, latency, price (None for default)
+    openrouter_provider_sort: Optional[str] = Field(default="throughput")
+    # Conversation turns sent to the LLM per call (0 sends the whole history)
+    chat_history_turns: int = Field(default=5, ge=0)
+    # Approximate token budget for those earlier turns (0 disables the cap)
+    chat_history_max_tokens: int = Field(default=2000, ge=0)
+    # Agent runs allowed in flight at once per worker (0 for no cap)
+    max_concurrent_chats: int = Field(default=32, ge=0)
 
     # LangSmith Settings
     langchain_api_key: Optional[str] = Field(default=None, env="LANGCHAIN_API_KEY")
@@ -29,31 +37,74 @@ class Settings(BaseSettings):
     # Vector Store Settings
     vector_store_path: str = Field(default="./vector_store")
     embedding_model: str = Field(default="sentence-transformers/all-MiniLM-L6-v2")
+    embedding_batch_size: int = Field(default=128, gt=0)
+    # Kept outside vector_store_path so clearing the store keeps the cache
+    embedding_cache_path: Optional[str] = Field(default="./embedding_cache/embeddings.sqlite3")
+    # HNSW graph parameters, applied when the collection is first created
+    hnsw_max_neighbors: int = Field(default=32, gt=0)
+    hnsw_ef_construction: int = Field(default=40, gt=0)
+    hnsw_ef_search: int = Field(default=16, gt=0)
 
     # Document Processing Settings
     documents_path: str = Field(default="./documents")
     chunk_size: int = Field(default=1000, gt=0)
     chunk_overlap: int = Field(default=200, ge=0)
+    ingest_workers: int = Field(default=1, gt=0)
+    # How long shutdown waits for startup ingestion to stop at a file boundary
+    ingest_shutdown_timeout_seconds: float = Field(default=30.0, ge=0.0)
+    # How long finished /process-documents jobs can still be polled
+    processing_job_retention_seconds: int = Field(default=3600, gt=0)
+    # Processes splitting the pages of a large PDF when ingesting with one worker
+    pdf_workers: int = Field(default=1, gt=0)
+    upload_concurrency: int = Field(default=4, gt=0)
+    # Uploaded and ingested chunks are buffered and written to the vector store in batches
+    write_batch_size: int = Field(default=256, gt=0)
+    write_batch_max_delay: float = Field(default=0.05, ge=0.0)
 
     # Retrieval Settings
     enable_reranker: bool = Field(default=False)
     reranker_model: str = Field(default="amberoad/bert-multilingual-passage-reranking-msmarco")
     default_k: int = Field(default=4, gt=0)
+    query_cache_size: int = Field(default=1024, ge=0)
+    # Retrieval results are reused for repeated queries until this process writes
+    # to the store, or for up to the TTL (which covers writes by other workers)
+    retrieval_cache_size: int = Field(default=10_000, ge=0)
+    retrieval_cache_ttl_seconds: int = Field(default=60, gt=0)
+    # Concurrent /search requests are grouped into one embedding + vector query
+    search_batch_size: int = Field(default=32, gt=0)
+    search_batch_max_delay: float = Field(default=0.005, ge=0.0)
+    warmup_on_startup: bool = Field(default=True)
 
     # Server Settings
     host: str = Field(default="0.0.0.0")
     port: int = Field(default=8000, gt=0, lt=65536)
+    thread_pool_size: int = Field(default=40, gt=0)
+    # Each worker process holds its own services, chat memory, job registry and
+    # logout revocations (a revoked token stays valid on the other workers)
+    workers: int = Field(default=1, gt=0)
 
     # Authentication Settings
     secret_key: str = Field(default="your-secret-key-change-this-in-production", env="SECRET_KEY")
     algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=30)
+    token_cache_size: int = Field(default=10_000, ge=0)
+    token_cache_ttl_seconds: int = Field(default=60, ge=0)
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
-        extra = "ignore"
+    @property
+    def hnsw_config(self) -> dict:
+        """HNSW index parameters for a newly created vector store collection."""
+        return {
+            "max_neighbors": self.hnsw_max_neighbors,
+            "ef_construction": self.hnsw_ef_construction,
+            "ef_search": self.hnsw_ef_search,
+        }
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        extra="ignore",
+    )
 
 
 # Global settings instance
@@ -1,7 +1,7 @@
 import os
+from functools import lru_cache
 from typing import Optional
 from langchain.callbacks.tracers import LangChainTracer
-from langchain.callbacks.manager import CallbackManager
 
 
 def setup_tracing(
@@ -18,19 +18,24 @@ def setup_tracing(
     Returns:
         A list of callback handlers
     """
-    callbacks = []
-
-    if langsmith_api_key:
-        # Set environment variables for LangSmith
-        os.environ["LANGCHAIN_API_KEY"] = langsmith_api_key
-        os.environ["LANGCHAIN_TRACING_V2"] = "true"
-        os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
-        
-        if langsmith_project:
-            os.environ["LANGCHAIN_PROJECT"] = langsmith_project
-            
-        # Add LangSmith tracer
-        callbacks.append(LangChainTracer(project_name=langsmith_project))
-        print(f"✅ LangSmith tracing enabled for project: {langsmith_project}")
-
-    return callbacks
+    if not langsmith_api_key:
+        return []
+
+    return [_langsmith_tracer(langsmith_api_key, langsmith_project)]
+
+
+@lru_cache(maxsize=1)
+def _langsmith_tracer(
+    langsmith_api_key: str, langsmith_project: Optional[str]
+) -> LangChainTracer:
+    """Configure LangSmith once per process and return its shared tracer."""
+    # Set environment variables for LangSmith
+    os.environ["LANGCHAIN_API_KEY"] = langsmith_api_key
+    os.environ["LANGCHAIN_TRACING_V2"] = "true"
+    os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
+
+    if langsmith_project:
+        os.environ["LANGCHAIN_PROJECT"] = langsmith_project
+
+    print(f"✅ LangSmith tracing enabled for project: {langsmith_project}")
+    return LangChainTracer(project_name=langsmith_project)
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import Optional
 from dotenv import load_dotenv
 from langchain_core.utils.utils import secret_from_env
@@ -27,6 +28,7 @@ class ChatOpenRouter(ChatOpenAI):
         openai_api_key: Optional[str] = None,
         openai_api_base: str = "https://openrouter.ai/api/v1",
         max_retries: int = 3,
+        provider_sort: Optional[str] = None,
         **kwargs,
     ):
         """Initialize the ChatOpenRouter with OpenRouter API settings.
@@ -36,9 +38,15 @@ class ChatOpenRouter(ChatOpenAI):
             openai_api_key: Optional API key (will use env var if not provided)
             openai_api_base: Base URL for the OpenRouter API
             max_retries: Maximum number of retries for failed requests (default: 3)
+            provider_sort: Optional OpenRouter provider ordering, e.g. "throughput",
+                "latency" or "price"
             **kwargs: Additional arguments to pass to ChatOpenAI
         """
         openai_api_key = openai_api_key or os.environ.get("OPENROUTER_API_KEY")
+        if provider_sort:
+            # OpenRouter-specific request field, sent alongside the OpenAI payload
+            extra_body = kwargs.pop("extra_body", None) or {}
+            kwargs["extra_body"] = {**extra_body, "provider": {"sort": provider_sort}}
         super().__init__(
             base_url=openai_api_base,
             openai_api_key=openai_api_key,
@@ -54,11 +62,17 @@ class LLMSettings(BaseSettings):
     agent_base_url: str = Field(..., env="AGENT_BASE_URL")
 
 
+@lru_cache(maxsize=1)
+def _llm_settings() -> LLMSettings:
+    """Read the local model settings from the environment once."""
+    return LLMSettings()
+
+
 class ChatLocalModel(ChatOpenAI):
     """Custom ChatOpenAI class for local model integration."""
     @classmethod
     def from_settings(cls, **kwargs):
-        settings = LLMSettings()
+        settings = _llm_settings()
         return cls(
             model=settings.agent_llm_model,
             api_key=settings.agent_api_key,
@@ -73,7 +87,7 @@ class ChatLocalModel(ChatOpenAI):
     def validate_settings(cls, data):
         # Fallback для прямой инициализации без settings
         if isinstance(data, dict) and 'model' not in data:
-            settings = LLMSettings()
+            settings = _llm_settings()
             data = {
                 **data,
                 'model': settings.agent_llm_model,
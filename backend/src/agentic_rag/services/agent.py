@@ -1,7 +1,13 @@
+import asyncio
 import os
+import threading
 import uuid
-from typing import Optional, Dict, Any, List
-from langchain_core.messages import HumanMessage, AIMessage
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, AsyncIterator, Iterable, List, Tuple
+from langchain.schema import Document
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
 from langchain_core.tools import tool
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
@@ -11,6 +17,15 @@ from ..core.tracing import setup_tracing
 from .retrieval import RetrievalService
 from .prompts import MANUSCRIPT_ANALYSIS_SYSTEM_PROMPT
 
+
+@dataclass
+class ChatResult:
+    """Agent reply, optionally with the documents retrieved to produce it."""
+
+    response: str
+    sources: Optional[List[Dict[str, Any]]] = None
+
+
 class AgenticChatBot:
     """Agentic chatbot with vector retrieval capabilities."""
 
@@ -23,6 +38,15 @@ class AgenticChatBot:
         max_tokens: int = 1500,
         langsmith_project: Optional[str] = None,
         use_local_model: bool = eval(os.getenv("USE_LOCAL_MODEL")),
+        query_cache_size: int = 1024,
+        results_cache_size: int = 10_000,
+        results_cache_ttl: float = 60,
+        debug: bool = False,
+        hnsw_config: Optional[Dict[str, Any]] = None,
+        history_turns: int = 5,
+        history_max_tokens: int = 2000,
+        provider_sort: Optional[str] = None,
+        max_concurrent_chats: int = 0,
     ):
         """Initialize the agentic chatbot."""
         # Инициализация LLM в зависимости от флага
@@ -35,52 +59,78 @@ class AgenticChatBot:
             self.llm = ChatOpenRouter(
                 model_name=model_name,
                 temperature=temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                provider_sort=provider_sort,
             )
 
         self.retrieval_service = RetrievalService(
             vector_store_path=vector_store_path,
-            enable_reranker=enable_reranker
+            enable_reranker=enable_reranker,
+            query_cache_size=query_cache_size,
+            results_cache_size=results_cache_size,
+            results_cache_ttl=results_cache_ttl,
+            hnsw_config=hnsw_config,
         )
 
         # Setup tracing
         self.callbacks = []
-        if os.getenv("LANGCHAIN_API_KEY"):
+        langsmith_api_key = os.getenv("LANGCHAIN_API_KEY")
+        if langsmith_api_key:
             self.callbacks = setup_tracing(
-                langsmith_api_key=os.getenv("LANGCHAIN_API_KEY"),
+                langsmith_api_key=langsmith_api_key,
                 langsmith_project=langsmith_project or os.getenv("LANGCHAIN_PROJECT"),
             )
 
+        # Cap async agent runs in flight so bursts queue here instead of
+        # tripping the provider's rate limits (0 leaves them uncapped)
+        self.max_concurrent_chats = max_concurrent_chats
+        self._chat_slots = (
+            asyncio.Semaphore(max_concurrent_chats) if max_concurrent_chats > 0 else nullcontext()
+        )
+
         # Initialize LangGraph memory system
         self.memory = MemorySaver()
-        self.thread_id = str(uuid.uuid4())
+        self.thread_id = uuid.uuid4().hex
         self.config = {"configurable": {"thread_id": self.thread_id}}
 
+        # Runs on the shared conversation thread are serialized: concurrent runs
+        # would load each other's half-finished turns and overwrite checkpoints.
+        # The async lock covers achat/astream_chat/aclear_memory (the API's
+        # path), the thread lock chat/clear_memory; use one family per bot.
+        self._conversation_lock = asyncio.Lock()
+        self._sync_conversation_lock = threading.Lock()
+
         # Create tools
         self.tools = self._create_tools()
 
-        # Create agent graph
+        # Create agent graph; debug prints every step, so keep it off in production
+        self.debug = debug
+        self.history_turns = history_turns
+        self.history_max_tokens = history_max_tokens
         self.app = self._create_agent_graph()
 
     def _create_tools(self) -> List:
         """Create tools using modern @tool decorator."""
 
-        @tool
-        def search_knowledge(query: str) -> str:
+        # The retrieved documents are returned as the tool artifact, so chat()
+        # can report sources without running the search a second time.
+        @tool(response_format="content_and_artifact")
+        def search_knowledge(query: str) -> tuple[str, List[Document]]:
             """Search ancient Arabic manuscripts from Uzbekistan for historical texts, religious content, scientific knowledge, cultural insights, and historical context from Central Asian manuscripts."""
             if not self.retrieval_service.is_store_ready():
-                return "Ancient manuscripts knowledge base is not available."
+                return "Ancient manuscripts knowledge base is not available.", []
 
             try:
-                context = self.retrieval_service.get_context_string(
-                    query=query, k=5, include_metadata=False
+                documents = self.retrieval_service.retrieve_documents(query=query, k=5)
+                context = self.retrieval_service.format_context(
+                    documents, include_metadata=False
                 )
                 if context.strip():
-                    return context.strip()
+                    return context.strip(), documents
                 else:
-                    return "No relevant information found in the ancient Arabic manuscripts from Uzbekistan."
+                    return "No relevant information found in the ancient Arabic manuscripts from Uzbekistan.", []
             except Exception as e:
-                return f"Error searching ancient manuscripts database: {str(e)}"
+                return f"Error searching ancient manuscripts database: {str(e)}", []
 
         return [search_knowledge]
 
@@ -90,34 +140,222 @@ class AgenticChatBot:
             self.llm,
             self.tools,
             checkpointer=self.memory,
-            prompt=MANUSCRIPT_ANALYSIS_SYSTEM_PROMPT
+            prompt=MANUSCRIPT_ANALYSIS_SYSTEM_PROMPT,
+            pre_model_hook=(
+                self._trim_history
+                if self.history_turns > 0 or self.history_max_tokens > 0
+                else None
+            ),
+            debug=self.debug,
         )
         return agent
 
-    def chat(self, message: str) -> str:
-        """Process chat message and return response using LangGraph agent."""
+    def _trim_history(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Send the LLM only the most recent part of the conversation.
+
+        Earlier turns are capped by count and by an approximate token budget;
+        the current turn is always sent whole. The full history stays in the
+        checkpointer, and cutting at user messages keeps each turn's tool
+        calls and results together.
+        """
+        messages = state["messages"]
+        turn_starts = [i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)]
+        if not turn_starts:
+            return {"llm_input_messages": messages}
+
+        start = 0
+        if self.history_turns > 0 and len(turn_starts) > self.history_turns:
+            start = turn_starts[-self.history_turns]
+        history = messages[start:turn_starts[-1]]
+        current = messages[turn_starts[-1]:]
+
+        if self.history_max_tokens > 0 and history:
+            budget = self.history_max_tokens - count_tokens_approximately(current)
+            history = (
+                trim_messages(
+                    history,
+                    max_tokens=budget,
+                    strategy="last",
+                    token_counter=count_tokens_approximately,
+                    start_on="human",
+                )
+                if budget > 0
+                else []
+            )
+
+        return {"llm_input_messages": history + current}
+
+    def chat(self, message: str, return_sources: bool = False) -> ChatResult:
+        """Process chat message and return response using LangGraph agent.
+
+        Args:
+            message: User message
+            return_sources: Whether to include the documents the agent
+                retrieved while answering this message
+
+        Returns:
+            Chat result with the response and, if requested, its sources
+        """
         try:
             human_message = HumanMessage(content=message)
 
-            response = self.app.invoke(
-                {"messages": [human_message]},
-                config=self.config
-            )
+            with self._sync_conversation_lock:
+                response = self.app.invoke(
+                    {"messages": [human_message]},
+                    config=self.config
+                )
+            return self._build_result(response, return_sources)
+
+        except Exception as e:
+            return ChatResult(response=f"Agent error: {str(e)}")
+
+    async def achat(self, message: str, return_sources: bool = False) -> ChatResult:
+        """Async version of chat() that awaits LLM calls instead of blocking a thread.
+
+        Args:
+            message: User message
+            return_sources: Whether to include the documents the agent
+                retrieved while answering this message
+
+        Returns:
+            Chat result with the response and, if requested, its sources
+        """
+        try:
+            human_message = HumanMessage(content=message)
+
+            # Wait for the conversation before taking a slot, so queued turns
+            # don't hold slots other runs could use
+            async with self._conversation_lock, self._chat_slots:
+                response = await self.app.ainvoke(
+                    {"messages": [human_message]},
+                    config=self.config
+                )
+            return self._build_result(response, return_sources)
+
+        except Exception as e:
+            return ChatResult(response=f"Agent error: {str(e)}")
+
+    async def achat_batch(
+        self,
+        messages: List[str],
+        thread_ids: List[str],
+        return_sources: bool = False,
+    ) -> List[ChatResult]:
+        """Answer several messages concurrently, each in its own conversation thread.
+
+        Args:
+            messages: User messages
+            thread_ids: Conversation thread for each message, in the same order;
+                they should be distinct, as concurrent runs on one thread
+                overwrite each other's turn
+            return_sources: Whether to include the documents the agent
+                retrieved while answering each message
+
+        Returns:
+            One chat result per message, in message order
+        """
+        async def run(message: str, thread_id: str) -> Dict[str, Any]:
+            # Shares the per-worker cap with achat() and astream_chat()
+            async with self._chat_slots:
+                return await self.app.ainvoke(
+                    {"messages": [HumanMessage(content=message)]},
+                    config={"configurable": {"thread_id": thread_id}},
+                )
+
+        responses = await asyncio.gather(
+            *(run(message, thread_id) for message, thread_id in zip(messages, thread_ids)),
+            return_exceptions=True,
+        )
+        return [
+            ChatResult(response=f"Agent error: {str(response)}")
+            if isinstance(response, Exception)
+            else self._build_result(response, return_sources)
+            for response in responses
+        ]
 
-            if response and "messages" in response:
-                for msg in reversed(response["messages"]):
-                    if isinstance(msg, AIMessage):
-                        return msg.content
+    def _build_result(self, response: Optional[Dict[str, Any]], return_sources: bool) -> ChatResult:
+        """Extract the reply and its sources from the agent's final state."""
+        messages = response.get("messages", []) if response else []
+        # Only look at messages produced for this turn, not earlier history
+        for i in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[i], HumanMessage):
+                messages = messages[i + 1:]
+                break
 
-            return "I couldn't generate a response."
+        reply = "I couldn't generate a response."
+        for msg in reversed(messages):
+            if isinstance(msg, AIMessage):
+                reply = msg.content
+                break
+
+        sources = None
+        if return_sources:
+            documents = [
+                doc
+                for msg in messages
+                if isinstance(msg, ToolMessage) and msg.artifact
+                for doc in msg.artifact
+            ]
+            sources = self._format_sources(documents)
+
+        return ChatResult(response=reply, sources=sources)
+
+    async def astream_chat(self, message: str) -> AsyncIterator[str]:
+        """Process chat message and yield response tokens as the LLM produces them.
+
+        LLM calls are awaited, so a streaming reply doesn't hold a thread.
+
+        Args:
+            message: User message
+
+        Yields:
+            Pieces of the agent's reply text
+        """
+        try:
+            human_message = HumanMessage(content=message)
+
+            async with self._conversation_lock, self._chat_slots:
+                async for chunk, metadata in self.app.astream(
+                    {"messages": [human_message]},
+                    config=self.config,
+                    stream_mode="messages",
+                ):
+                    # Token chunks, or whole messages from non-streaming models;
+                    # tool output is skipped
+                    if (
+                        isinstance(chunk, AIMessage)
+                        and metadata.get("langgraph_node") == "agent"
+                        and chunk.content
+                    ):
+                        yield chunk.content
 
         except Exception as e:
-            return f"Agent error: {str(e)}"
+            yield f"Agent error: {str(e)}"
+
+    def warm_up(self) -> None:
+        """Warm up retrieval so the first chat doesn't pay model load costs.
+
+        The LLM is not called here, as that would be a billed remote request.
+        """
+        self.retrieval_service.warm_up()
 
     def clear_memory(self) -> None:
         """Clear conversation memory by creating new thread."""
-        self.thread_id = str(uuid.uuid4())
+        with self._sync_conversation_lock:
+            self._reset_thread()
+
+    async def aclear_memory(self) -> None:
+        """Clear conversation memory once any run in progress has finished."""
+        async with self._conversation_lock:
+            self._reset_thread()
+
+    def _reset_thread(self) -> None:
+        """Switch to a new conversation thread and drop the old one."""
+        old_thread_id = self.thread_id
+        self.thread_id = uuid.uuid4().hex
         self.config = {"configurable": {"thread_id": self.thread_id}}
+        # Nothing reads the old thread again; drop its checkpoints
+        self.memory.delete_thread(old_thread_id)
 
     def get_knowledge_base_info(self) -> Dict[str, Any]:
         """Get knowledge base information."""
@@ -130,16 +368,48 @@ class AgenticChatBot:
 
         try:
             results = self.retrieval_service.retrieve_documents(query, k=k)
-            content = [doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content for doc in results]
             return {
                 "query": query,
-                "results": [
-                    {
-                        "content": content,
-                        "metadata": doc.metadata
-                    }
-                    for doc in results
-                ]
+                "results": self._format_sources(results),
             }
         except Exception as e:
             return {"error": str(e), "results": []}
+
+    def search_knowledge_base_batch(
+        self, requests: List[Tuple[str, int]]
+    ) -> List[Dict[str, Any]]:
+        """Direct knowledge base search for several (query, k) pairs at once.
+
+        Returns one result per request, shaped like search_knowledge_base().
+        """
+        if not self.retrieval_service.is_store_ready():
+            return [{"error": "Knowledge base not ready", "results": []} for _ in requests]
+
+        try:
+            # One vector search per distinct k: retrieving with a larger k and
+            # trimming would rerank a different candidate pool and cache the
+            # result under the wrong key
+            by_k: Dict[int, List[int]] = {}
+            for i, (_, k) in enumerate(requests):
+                by_k.setdefault(k, []).append(i)
+
+            responses: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+            for k, indices in by_k.items():
+                queries = [requests[i][0] for i in indices]
+                batch_results = self.retrieval_service.retrieve_documents_batch(queries, k=k)
+                for i, query, results in zip(indices, queries, batch_results):
+                    responses[i] = {"query": query, "results": self._format_sources(results)}
+            return responses
+        except Exception as e:
+            return [{"error": str(e), "results": []} for _ in requests]
+
+    @staticmethod
+    def _format_sources(documents: Iterable[Document]) -> List[Dict[str, Any]]:
+        """Convert documents into truncated source entries for API responses."""
+        sources = []
+        for doc in documents:
+            content = doc.page_content
+            if len(content) > 300:
+                content = content[:300] + "..."
+            sources.append({"content": content, "metadata": doc.metadata})
+        return sources
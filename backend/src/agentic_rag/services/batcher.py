@@ -0,0 +1,119 @@
+import asyncio
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+from anyio import to_thread
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class DynamicBatcher(Generic[T, R]):
+    """Groups concurrent requests into batches for a blocking batch function.
+
+    Each batch waits up to max_delay after its first item for more to arrive,
+    and requests that arrive while a batch is running go out together in the
+    next one. A lone request therefore pays at most max_delay, while a busy
+    server sends fewer, larger batches to the model and vector store.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[T]], List[R]],
+        max_batch_size: int = 32,
+        max_delay: float = 0.005,
+        item_size: Optional[Callable[[T], int]] = None,
+    ):
+        """Initialize the batcher.
+
+        Args:
+            process_batch: Blocking function mapping a list of items to a list
+                of results in the same order; run in a worker thread
+            max_batch_size: Batch size that sends a batch without waiting any
+                longer, counted in items or by item_size
+            max_delay: Extra time in seconds to wait for more items once a
+                batch has started filling (0 sends whatever is queued)
+            item_size: Optional function giving each item's size, for items
+                that carry several units of work; a single item larger than
+                max_batch_size still goes out on its own
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.item_size = item_size
+
+        self._queue: asyncio.Queue[Tuple[T, asyncio.Future]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start the background batching loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Finish queued requests and stop the background loop."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, item: T) -> R:
+        """Queue an item and wait for its result from the next batch."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = self._size(batch[0][0])
+            deadline = loop.time() + self.max_delay
+
+            # Keep collecting until the batch is full or the oldest item is due
+            while size < self.max_batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                batch.append(item)
+                size += self._size(item[0])
+
+            await self._flush(batch)
+
+    def _size(self, item: T) -> int:
+        return self.item_size(item) if self.item_size is not None else 1
+
+    async def _flush(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        try:
+            results = await to_thread.run_sync(
+                self.process_batch, [item for item, _ in batch]
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            # A short result list would otherwise leave the rest waiting forever
+            if len(results) < len(batch):
+                error = RuntimeError(
+                    f"Batch function returned {len(results)} results for {len(batch)} items"
+                )
+                for _, future in batch[len(results):]:
+                    if not future.done():
+                        future.set_exception(error)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
@@ -0,0 +1,51 @@
+from typing import List
+from langchain.schema import Document
+
+from .batcher import DynamicBatcher
+from .vector_store import VectorStoreManager
+
+
+class BulkWriter:
+    """Coalesces vector store writes from concurrent requests into batched flushes."""
+
+    def __init__(
+        self,
+        vector_store: VectorStoreManager,
+        max_batch: int = 256,
+        max_delay: float = 0.05,
+    ):
+        """Initialize the bulk writer.
+
+        Args:
+            vector_store: Vector store the buffered documents are written to
+            max_batch: Number of buffered chunks that triggers an immediate flush
+            max_delay: Longest time in seconds a chunk waits before being flushed
+        """
+        self.vector_store = vector_store
+        # Each request's documents are one item, sized by their chunk count
+        self._batcher: DynamicBatcher[List[Document], None] = DynamicBatcher(
+            self._write, max_batch_size=max_batch, max_delay=max_delay, item_size=len
+        )
+
+    async def start(self) -> None:
+        """Start the background flush loop."""
+        await self._batcher.start()
+
+    async def stop(self) -> None:
+        """Flush anything still buffered and stop the background loop."""
+        await self._batcher.stop()
+
+    async def add_documents(self, documents: List[Document]) -> None:
+        """Queue documents for writing and wait until their batch is stored.
+
+        Raises:
+            Exception: Whatever the vector store raised while flushing the batch
+        """
+        if not documents:
+            return
+        await self._batcher.submit(documents)
+
+    def _write(self, batches: List[List[Document]]) -> List[None]:
+        """Store several requests' documents in one write."""
+        self.vector_store.add_documents([doc for docs in batches for doc in docs])
+        return [None] * len(batches)
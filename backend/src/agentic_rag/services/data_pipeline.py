@@ -1,12 +1,34 @@
-import os
-from pathlib import Path
-from typing import List, Optional
+import logging
+import multiprocessing
+import threading
+from functools import partial
+from typing import Iterable, List, Optional
 from langchain.schema import Document
 
 from .document_loader import DocumentLoader
+from .embedding_cache import EmbeddingCache
 from .text_splitter import TextChunker
 from .vector_store import VectorStoreManager
 
+logger = logging.getLogger(__name__)
+
+
+def _load_and_chunk_file(
+    file_path: str, chunk_size: int, chunk_overlap: int, pdf_workers: int = 1
+) -> List[Document]:
+    """Load and chunk a single file.
+
+    Defined at module level so it can be pickled into worker processes.
+    """
+    try:
+        documents = DocumentLoader(pdf_workers=pdf_workers).load_document(file_path)
+    except Exception as e:
+        logger.warning("Error loading %s: %s", file_path, e)
+        return []
+
+    text_chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return text_chunker.chunk_documents(documents)
+
 
 class DataPreparationPipeline:
     """Pipeline for preparing documents and storing them in vector database."""
@@ -17,6 +39,11 @@ class DataPreparationPipeline:
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
         embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        embedding_batch_size: int = 128,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        hnsw_config: Optional[dict] = None,
+        write_batch_size: int = 512,
+        pdf_workers: int = 1,
     ):
         """Initialize the data preparation pipeline.
 
@@ -25,116 +52,125 @@ class DataPreparationPipeline:
             chunk_size: Size of text chunks
             chunk_overlap: Overlap between chunks
             embedding_model: Embedding model to use
+            embedding_batch_size: Number of chunks embedded per model call
+            embedding_cache: Optional persistent cache of document embeddings
+            hnsw_config: HNSW index parameters for a newly created store
+            write_batch_size: Number of chunks buffered before each vector
+                store write during ingestion
+            pdf_workers: Number of processes sharing the pages of a large PDF
+                when files are ingested one at a time
         """
+        self.write_batch_size = write_batch_size
+        self.pdf_workers = pdf_workers
         self.document_loader = DocumentLoader()
         self.text_chunker = TextChunker(
             chunk_size=chunk_size, chunk_overlap=chunk_overlap
         )
         self.vector_store = VectorStoreManager(
-            persist_directory=vector_store_path, embedding_model=embedding_model
+            persist_directory=vector_store_path,
+            embedding_model=embedding_model,
+            embedding_batch_size=embedding_batch_size,
+            embedding_cache=embedding_cache,
+            hnsw_config=hnsw_config,
         )
 
     def process_documents(
-        self, documents_path: str, clear_existing: bool = False
+        self,
+        documents_path: str,
+        clear_existing: bool = False,
+        workers: int = 1,
+        stop_event: Optional[threading.Event] = None,
     ) -> int:
         """Process all documents in a directory and add to vector store.
 
+        Files are loaded and chunked one at a time and their chunks written
+        in batches of write_batch_size, so memory holds one batch rather
+        than the whole corpus.
+
         Args:
             documents_path: Path to directory containing documents
             clear_existing: Whether to clear existing vector store
+            workers: Number of processes used to load and chunk files
+            stop_event: Optional event that stops ingestion between files and
+                batches; chunks already written stay in the store
 
         Returns:
             Number of document chunks processed
         """
         if clear_existing:
-            print("Clearing existing vector store...")
+            logger.info("Clearing existing vector store...")
             self.vector_store.clear_store()
 
         # Initialize vector store
         self.vector_store.initialize_store()
 
-        # Load documents
-        print(f"Loading documents from {documents_path}...")
-        documents = self.document_loader.load_documents(documents_path)
-
-        if not documents:
-            print("No documents found to process.")
+        file_paths = [str(path) for path in self.document_loader.find_documents(documents_path)]
+        if not file_paths:
+            logger.info("No documents found to process.")
             return 0
 
-        print(f"Loaded {len(documents)} documents.")
-
-        # Chunk documents
-        print("Chunking documents...")
-        chunks = self.text_chunker.chunk_documents(documents)
-        print(f"Created {len(chunks)} chunks.")
-
-        # Add to vector store
-        print("Adding chunks to vector store...")
-        self.vector_store.add_documents(chunks)
-
-        print("Data preparation completed successfully.")
-        return len(chunks)
-
-    def process_single_document(
-        self, file_path: str, metadata: Optional[dict] = None
-    ) -> int:
-        """Process a single document and add to vector store.
-
-        Args:
-            file_path: Path to the document file
-            metadata: Additional metadata for the document
-
-        Returns:
-            Number of chunks created
-        """
-        # Load document
-        documents = self.document_loader.load_document(file_path)
+        workers = min(workers, len(file_paths))
+        worker = partial(
+            _load_and_chunk_file,
+            chunk_size=self.text_chunker.chunk_size,
+            chunk_overlap=self.text_chunker.chunk_overlap,
+            # Pool workers are daemonic and can't start their own pools
+            pdf_workers=self.pdf_workers if workers == 1 else 1,
+        )
 
-        if not documents:
+        if workers > 1:
+            # Parsing runs in the workers; the vector store is only written
+            # from the calling process. imap hands back files as they finish.
+            logger.info("Loading and chunking %d files with %d workers...", len(file_paths), workers)
+            with multiprocessing.Pool(workers) as pool:
+                total = self._store_chunks(pool.imap(worker, file_paths), stop_event)
+        else:
+            logger.info("Loading and chunking %d files from %s...", len(file_paths), documents_path)
+            total = self._store_chunks(map(worker, file_paths), stop_event)
+
+        if stop_event is not None and stop_event.is_set():
+            # Leaving the pool's context above terminated its workers
+            logger.info("Ingestion stopped after %d chunks.", total)
+            return total
+
+        if not total:
+            logger.info("No documents found to process.")
             return 0
 
-        # Add metadata if provided
-        if metadata:
-            for doc in documents:
-                doc.metadata.update(metadata)
-
-        # Chunk document
-        chunks = self.text_chunker.chunk_documents(documents)
-
-        # Initialize vector store if needed
-        if not self.vector_store.vector_store:
-            self.vector_store.initialize_store()
-
-        # Add to vector store
-        self.vector_store.add_documents(chunks)
-
-        return len(chunks)
-
-    def add_text_chunks(self, text: str, metadata: Optional[dict] = None) -> int:
-        """Add raw text chunks to vector store.
-
-        Args:
-            text: Raw text to chunk and add
-            metadata: Metadata for the text chunks
-
-        Returns:
-            Number of chunks created
-        """
-        chunks = self.text_chunker.chunk_text(text, metadata or {})
+        logger.info("Data preparation completed successfully: %d chunks.", total)
+        return total
 
-        if not self.vector_store.vector_store:
-            self.vector_store.initialize_store()
-
-        self.vector_store.add_documents(chunks)
-        return len(chunks)
+    def _store_chunks(
+        self,
+        file_chunks: Iterable[List[Document]],
+        stop_event: Optional[threading.Event] = None,
+    ) -> int:
+        """Write per-file chunk lists to the vector store in fixed-size batches."""
+        total = 0
+        batch: List[Document] = []
+        for chunks in file_chunks:
+            batch.extend(chunks)
+            while len(batch) >= self.write_batch_size:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                self.vector_store.add_documents(batch[: self.write_batch_size])
+                total += self.write_batch_size
+                batch = batch[self.write_batch_size :]
+            if stop_event is not None and stop_event.is_set():
+                # Unwritten chunks are dropped
+                return total
+
+        if batch:
+            self.vector_store.add_documents(batch)
+            total += len(batch)
+        return total
 
     def get_store_stats(self) -> dict:
         """Get statistics about the vector store."""
-        if not self.vector_store.vector_store:
-            self.vector_store.initialize_store()
-
+        # Checked first: opening the store creates its files
+        store_exists = self.vector_store._store_exists()
         return {
             "document_count": self.vector_store.get_collection_count(),
-            "store_exists": self.vector_store._store_exists(),
+            "store_exists": store_exists,
             "persist_directory": str(self.vector_store.persist_directory),
         }
@@ -1,13 +1,44 @@
+import codecs
+import mmap
+import multiprocessing
+import os
+from itertools import chain
 from pathlib import Path
-from typing import List, Union
-from langchain_community.document_loaders import TextLoader
-from langchain_community.document_loaders import PyPDFLoader
+from typing import Iterator, List, Union
+import pymupdf
 from langchain.schema import Document
 
 
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages start..stop-1 of a PDF.
+
+    Defined at module level so it can be pickled into worker processes.
+    Each worker opens its own handle, as MuPDF documents can't be shared.
+    """
+    with pymupdf.open(path) as pdf:
+        return [pdf[i].get_text("text") for i in range(start, stop)]
+
+
 class DocumentLoader:
     """Handles loading of TXT and PDF documents."""
 
+    SUPPORTED_EXTENSIONS = frozenset({".txt", ".pdf"})
+    # Below this many pages per worker a PDF is parsed in-process
+    MIN_PAGES_PER_WORKER = 16
+    # Tried in order when a text file isn't valid UTF-8
+    FALLBACK_ENCODINGS = ("cp1251", "windows-1252", "iso-8859-1")
+    # Leading bytes checked for UTF-8 before the whole file is decoded
+    ENCODING_PROBE_SIZE = 64 * 1024
+
+    def __init__(self, pdf_workers: int = 1):
+        """Initialize the document loader.
+
+        Args:
+            pdf_workers: Number of processes sharing the pages of one large
+                PDF (1 parses every page in the calling process)
+        """
+        self.pdf_workers = pdf_workers
+
     def load_document(self, file_path: Union[str, Path]) -> List[Document]:
         """Load a single document (TXT or PDF)."""
         file_path = Path(file_path)
@@ -24,44 +55,130 @@ class DocumentLoader:
 
     def load_documents(self, directory_path: Union[str, Path]) -> List[Document]:
         """Load all TXT and PDF documents from a directory."""
+        documents = []
+
+        for file_path in self.find_documents(directory_path):
+            try:
+                docs = self.load_document(file_path)
+                documents.extend(docs)
+            except Exception as e:
+                print(f"Error loading {file_path}: {e}")
+
+        return documents
+
+    def find_documents(self, directory_path: Union[str, Path]) -> List[Path]:
+        """Find all TXT and PDF files in a directory tree."""
         directory_path = Path(directory_path)
 
         if not directory_path.is_dir():
             raise NotADirectoryError(f"Directory not found: {directory_path}")
 
-        documents = []
-        supported_extensions = [".txt", ".pdf"]
+        return [Path(path) for path in self._scan_directory(str(directory_path))]
 
-        for file_path in directory_path.rglob("*"):
-            if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-                try:
-                    docs = self.load_document(file_path)
-                    documents.extend(docs)
-                except Exception as e:
-                    print(f"Error loading {file_path}: {e}")
+    @classmethod
+    def _scan_directory(cls, directory: str) -> Iterator[str]:
+        """Yield paths of supported files under a directory, recursively.
 
-        return documents
+        scandir entries carry their file type from the directory listing, so
+        names are filtered by extension first and only matches cost a stat.
+        """
+        subdirectories = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                    continue
+                name = entry.name
+                dot = name.rfind(".")
+                # A leading dot marks a hidden file, not an extension
+                if dot > 0 and name[dot:].lower() in cls.SUPPORTED_EXTENSIONS and entry.is_file():
+                    yield entry.path
+
+        # Recurse after closing this listing, so open handles stay bounded
+        for subdirectory in subdirectories:
+            yield from cls._scan_directory(subdirectory)
 
     def _load_txt(self, file_path: Path) -> List[Document]:
         """Load a TXT file with proper encoding handling."""
+        with open(file_path, "rb") as f:
+            # Decode straight from the mapped file instead of a read() copy;
+            # an empty file can't be mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                text = ""
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    text = self._decode_text(mapped)
+
+        # Universal newlines, as reading the file in text mode would give
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+        return [Document(page_content=text, metadata={"source": str(file_path)})]
+
+    @classmethod
+    def _decode_text(cls, data: mmap.mmap) -> str:
+        """Decode file contents with the encoding sniffed from their first bytes."""
+        encoding = cls._detect_encoding(data)
+        fallbacks = [enc for enc in cls.FALLBACK_ENCODINGS if enc != encoding]
+        # The probe only covers the head of the file, so invalid bytes
+        # further in can still fail the full decode
+        for candidate in (encoding, *fallbacks):
+            try:
+                return str(data, candidate)
+            except UnicodeDecodeError:
+                continue
+        # If all fail, decode with error handling
+        return str(data, "utf-8", errors="replace")
+
+    @classmethod
+    def _detect_encoding(cls, data: mmap.mmap) -> str:
+        """Pick an encoding from the byte order mark or a UTF-8 probe."""
+        head = data[:4]
+        # UTF-32 LE starts with the UTF-16 LE mark, so it is checked first
+        if head.startswith((codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE)):
+            return "utf-32"
+        if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return "utf-16"
+        if head.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig"
+
+        # final=False so a character cut off at the probe boundary isn't an error
+        decoder = codecs.getincrementaldecoder("utf-8")()
         try:
-            # Try UTF-8 first
-            loader = TextLoader(str(file_path), encoding='utf-8')
-            return loader.load()
+            decoder.decode(data[: cls.ENCODING_PROBE_SIZE], final=False)
         except UnicodeDecodeError:
-            # Fallback to other encodings
-            encodings = ['cp1251', 'windows-1252', 'iso-8859-1']
-            for encoding in encodings:
-                try:
-                    loader = TextLoader(str(file_path), encoding=encoding)
-                    return loader.load()
-                except UnicodeDecodeError:
-                    continue
-            # If all fail, try with error handling
-            loader = TextLoader(str(file_path), encoding='utf-8', errors='replace')
-            return loader.load()
+            return cls.FALLBACK_ENCODINGS[0]
+        return "utf-8"
 
     def _load_pdf(self, file_path: Path) -> List[Document]:
-        """Load a PDF file."""
-        loader = PyPDFLoader(str(file_path))
-        return loader.load()
+        """Load a PDF file, one document per page."""
+        source = str(file_path)
+        # MuPDF parses the pages natively, far faster than pure-Python pypdf
+        with pymupdf.open(source) as pdf:
+            total_pages = pdf.page_count
+            workers = min(self.pdf_workers, total_pages // self.MIN_PAGES_PER_WORKER)
+            if workers <= 1:
+                texts = [page.get_text("text") for page in pdf]
+
+        if workers > 1:
+            texts = self._extract_pages_parallel(source, total_pages, workers)
+
+        return [
+            Document(
+                page_content=text,
+                metadata={"source": source, "page": i, "total_pages": total_pages},
+            )
+            for i, text in enumerate(texts)
+        ]
+
+    @staticmethod
+    def _extract_pages_parallel(source: str, total_pages: int, workers: int) -> List[str]:
+        """Extract page texts with each worker handling one contiguous page range."""
+        step = -(-total_pages // workers)
+        ranges = [
+            (source, start, min(start + step, total_pages))
+            for start in range(0, total_pages, step)
+        ]
+        # starmap keeps the ranges in order, so pages come back in sequence
+        with multiprocessing.Pool(workers) as pool:
+            return list(chain.from_iterable(pool.starmap(_extract_page_range, ranges)))
@@ -0,0 +1,162 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from cachetools import LRUCache
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed several search queries with as few model calls as possible.
+
+    Wrappers in this module batch through to the model they wrap. HuggingFace
+    models encode queries exactly like documents unless query-specific encode
+    kwargs are set, so their batched document path is used.
+    """
+    batched = getattr(embeddings, "embed_queries", None)
+    if batched is not None:
+        return batched(texts)
+    if isinstance(embeddings, HuggingFaceEmbeddings) and not embeddings.query_encode_kwargs:
+        return embeddings.embed_documents(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+class EmbeddingCache:
+    """Persistent SQLite cache of embedding vectors keyed by content hash."""
+
+    # Stay below SQLite's default limit on bound parameters per statement
+    _MAX_KEYS_PER_QUERY = 500
+
+    def __init__(self, db_path: str):
+        """Initialize the embedding cache.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """Build the cache key for a text embedded with a given model."""
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Look up cached vectors; missing keys are absent from the result."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), self._MAX_KEYS_PER_QUERY):
+                batch = keys[start : start + self._MAX_KEYS_PER_QUERY]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                found.update(
+                    (key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows
+                )
+        return found
+
+    def put(self, pairs: Iterable[Tuple[str, List[float]]]) -> None:
+        """Store vectors as float32 blobs."""
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in pairs]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only runs the model on texts missing from the cache."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        """Initialize the cached embeddings.
+
+        Args:
+            embeddings: Underlying embedding model
+            cache: Persistent cache for document vectors
+            model_name: Model identifier mixed into the cache keys
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, reusing cached vectors and writing new ones through."""
+        keys = [self.cache.make_key(self.model_name, text) for text in texts]
+        vectors = self.cache.get(list(set(keys)))
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            missing_keys = list(missing)
+            new_vectors = self.embeddings.embed_documents([missing[key] for key in missing_keys])
+            self.cache.put(zip(missing_keys, new_vectors))
+            vectors.update(
+                (key, np.asarray(vector, dtype=np.float32))
+                for key, vector in zip(missing_keys, new_vectors)
+            )
+
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the underlying model (queries are not persisted)."""
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries with the underlying model (not persisted)."""
+        return embed_queries(self.embeddings, texts)
+
+
+class QueryCachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-memory LRU cache for query vectors."""
+
+    def __init__(self, embeddings: Embeddings, maxsize: int = 1024):
+        """Initialize the query cache.
+
+        Args:
+            embeddings: Underlying embedding model
+            maxsize: Maximum number of distinct queries kept in memory
+        """
+        self.embeddings = embeddings
+        # Per-instance cache so entries never outlive the model that produced them
+        self._cache: LRUCache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents with the underlying model."""
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, answering repeated queries from memory."""
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, running the model once for all uncached ones."""
+        with self._lock:
+            vectors = {text: self._cache[text] for text in texts if text in self._cache}
+
+        missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+        if missing:
+            new_vectors = [tuple(v) for v in embed_queries(self.embeddings, missing)]
+            vectors.update(zip(missing, new_vectors))
+            with self._lock:
+                self._cache.update(zip(missing, new_vectors))
+
+        return [list(vectors[text]) for text in texts]
+
+    def clear_cache(self) -> None:
+        """Drop all cached query vectors."""
+        with self._lock:
+            self._cache.clear()
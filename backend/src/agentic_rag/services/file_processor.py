@@ -1,33 +1,44 @@
 import io
-import tempfile
+import mmap
+import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Tuple
-from langchain_community.document_loaders import TextLoader
-from langchain_community.document_loaders import PyPDFLoader
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+import pymupdf
 from langchain.schema import Document
 
 
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds FileProcessor.MAX_FILE_SIZE."""
+
+
 class FileProcessor:
     """Handles processing of uploaded files from bytes."""
 
-    SUPPORTED_EXTENSIONS = {".txt", ".pdf"}
+    SUPPORTED_EXTENSIONS = frozenset({".txt", ".pdf"})
     MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB limit
 
     def process_uploaded_file(
-        self, file_bytes: bytes, filename: str, metadata: Optional[dict] = None
+        self,
+        file: Union[bytes, BinaryIO],
+        filename: str,
+        metadata: Optional[dict] = None,
     ) -> Tuple[List[Document], dict]:
-        """Process an uploaded file from bytes.
+        """Process an uploaded file from bytes or a binary stream.
 
         Args:
-            file_bytes: Raw file bytes
+            file: Raw file bytes or a seekable binary file object
             filename: Original filename
             metadata: Additional metadata
 
         Returns:
             Tuple of (documents, file_info)
         """
+        if isinstance(file, (bytes, bytearray)):
+            file = io.BytesIO(file)
+
         # Validate file
-        file_info = self._validate_file(file_bytes, filename)
+        file_info = self._validate_file(file, filename)
 
         # Extract file extension
         file_path = Path(filename)
@@ -41,55 +52,112 @@ class FileProcessor:
         doc_metadata.update(
             {
                 "source": filename,
-                "file_size": len(file_bytes),
+                "file_size": file_info["size_bytes"],
                 "file_type": extension[1:],  # Remove the dot
             }
         )
 
         # Process based on file type
         if extension == ".txt":
-            documents = self._process_text_bytes(file_bytes, doc_metadata)
+            documents = self._process_text_file(file, doc_metadata)
         elif extension == ".pdf":
-            documents = self._process_pdf_bytes(file_bytes, doc_metadata)
+            documents = self._process_pdf_file(file, doc_metadata)
         else:
             raise ValueError(f"Unsupported file type: {extension}")
 
         return documents, file_info
 
-    def _validate_file(self, file_bytes: bytes, filename: str) -> dict:
-        """Validate uploaded file."""
-        file_size = len(file_bytes)
+    def _validate_file(self, file: BinaryIO, filename: str) -> dict:
+        """Validate uploaded file without reading its contents."""
+        file.seek(0, os.SEEK_END)
+        file_size = file.tell()
+        file.seek(0)
 
-        if file_size == 0:
-            raise ValueError("File is empty")
+        return self.validate_header(filename, file_size)
+
+    @classmethod
+    def validate_header(cls, filename: str, file_size: Optional[int]) -> dict:
+        """Validate an upload from its name and declared size alone.
+
+        Lets callers reject a file before reading or processing its contents.
+
+        Args:
+            filename: Original filename
+            file_size: Size in bytes, or None if not known yet
+
+        Returns:
+            File info dict (size fields are None when the size is unknown)
+
+        Raises:
+            FileTooLargeError: If the size exceeds MAX_FILE_SIZE
+            ValueError: If the extension is unsupported or the file is empty
+        """
+        extension = Path(filename).suffix.lower()
 
-        if file_size > self.MAX_FILE_SIZE:
+        if extension not in cls.SUPPORTED_EXTENSIONS:
             raise ValueError(
-                f"File size ({file_size} bytes) exceeds maximum allowed size ({self.MAX_FILE_SIZE} bytes)"
+                f"Unsupported file type: {extension or filename}. "
+                f"Supported types: {', '.join(sorted(cls.SUPPORTED_EXTENSIONS))}"
             )
 
-        file_path = Path(filename)
-        extension = file_path.suffix.lower()
+        if file_size == 0:
+            raise ValueError("File is empty")
 
-        if extension not in self.SUPPORTED_EXTENSIONS:
-            raise ValueError(f"Unsupported file extension: {extension}")
+        if file_size is not None and file_size > cls.MAX_FILE_SIZE:
+            raise FileTooLargeError(
+                f"File size ({file_size} bytes) exceeds maximum allowed size ({cls.MAX_FILE_SIZE} bytes)"
+            )
 
         return {
             "filename": filename,
             "size_bytes": file_size,
             "extension": extension,
-            "size_mb": round(file_size / (1024 * 1024), 2),
+            "size_mb": round(file_size / (1024 * 1024), 2) if file_size is not None else None,
         }
 
-    def _process_text_bytes(self, file_bytes: bytes, metadata: dict) -> List[Document]:
-        """Process text file from bytes."""
+    @staticmethod
+    @contextmanager
+    def _open_buffer(file: BinaryIO) -> Iterator[memoryview]:
+        """Expose a binary stream's contents as a buffer, avoiding copies where possible."""
+        file.seek(0)
+        if isinstance(file, io.BytesIO):
+            with file.getbuffer() as buffer:
+                yield buffer
+            return
+
+        # Spooled uploads only have a file descriptor once rolled over to
+        # disk (the same check Starlette makes); map those and read the
+        # page cache directly
+        if getattr(file, "_rolled", True):
+            try:
+                fileno = file.fileno()
+            except (AttributeError, OSError):
+                pass
+            else:
+                with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+                    with memoryview(mapped) as buffer:
+                        yield buffer
+                return
+
+        # Small in-memory uploads are simply read
+        with memoryview(file.read()) as buffer:
+            yield buffer
+
+    def _decode_stream(self, file: BinaryIO, encoding: str) -> str:
+        """Decode a binary stream without first copying it into a bytes object."""
+        # Line endings are kept exactly as uploaded
+        with self._open_buffer(file) as buffer:
+            return str(buffer, encoding)
+
+    def _process_text_file(self, file: BinaryIO, metadata: dict) -> List[Document]:
+        """Process text file from a binary stream."""
         try:
             # Try UTF-8 first
-            text_content = file_bytes.decode("utf-8")
+            text_content = self._decode_stream(file, "utf-8")
         except UnicodeDecodeError:
             try:
                 # Fallback to latin-1
-                text_content = file_bytes.decode("latin-1")
+                text_content = self._decode_stream(file, "latin-1")
             except UnicodeDecodeError:
                 raise ValueError(
                     "Unable to decode text file. Please ensure it's in UTF-8 or Latin-1 encoding."
@@ -100,39 +168,27 @@ class FileProcessor:
 
         return [document]
 
-    def _process_pdf_bytes(self, file_bytes: bytes, metadata: dict) -> List[Document]:
-        """Process PDF file from bytes."""
-        # Create a temporary file to use with PyPDF2Loader
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-            temp_file.write(file_bytes)
-            temp_file_path = temp_file.name
-
-        try:
-            # Use PyPDFLoader with temporary file
-            loader = PyPDFLoader(temp_file_path)
-            documents = loader.load()
-
-            # Update metadata for all pages
-            for i, doc in enumerate(documents):
-                doc.metadata.update(metadata)
-                doc.metadata["page"] = i + 1
-
-            return documents
-
-        finally:
-            # Clean up temporary file
-            try:
-                Path(temp_file_path).unlink()
-            except Exception:
-                pass  # Ignore cleanup errors
+    def _process_pdf_file(self, file: BinaryIO, metadata: dict) -> List[Document]:
+        """Process PDF file from a binary stream."""
+        # MuPDF parses straight from the upload's buffer: nothing is written
+        # to disk and, for mapped or BytesIO uploads, nothing is copied
+        with self._open_buffer(file) as buffer:
+            with pymupdf.open(stream=buffer, filetype="pdf") as pdf:
+                total_pages = pdf.page_count
+                return [
+                    Document(
+                        page_content=page.get_text("text"),
+                        metadata={**metadata, "page": i + 1, "total_pages": total_pages},
+                    )
+                    for i, page in enumerate(pdf)
+                ]
 
     @staticmethod
     def get_supported_extensions() -> List[str]:
         """Get list of supported file extensions."""
-        return list(FileProcessor.SUPPORTED_EXTENSIONS)
+        return sorted(FileProcessor.SUPPORTED_EXTENSIONS)
 
     @staticmethod
     def is_supported_file(filename: str) -> bool:
         """Check if file extension is supported."""
-        extension = Path(filename).suffix.lower()
-        return extension in FileProcessor.SUPPORTED_EXTENSIONS
+        return os.path.splitext(filename)[1].lower() in FileProcessor.SUPPORTED_EXTENSIONS
@@ -1,8 +1,28 @@
+import hashlib
+import heapq
+import threading
+from functools import lru_cache
+from operator import itemgetter
 from typing import List, Optional, Tuple
+from cachetools import LRUCache
 from sentence_transformers import CrossEncoder
 from langchain.schema import Document
 
 
+@lru_cache(maxsize=4)
+def _load_cross_encoder(model_name: str) -> CrossEncoder:
+    """Load a cross-encoder once per process.
+
+    Every RetrievalService builds its own SemanticReranker; sharing the model
+    keeps one copy of its weights in memory however many there are.
+    """
+    cross_encoder = CrossEncoder(model_name)
+    # Half precision roughly doubles GPU throughput; CPU stays fp32
+    if cross_encoder.device.type == "cuda":
+        cross_encoder.model.half()
+    return cross_encoder
+
+
 class SemanticReranker:
     """Optional semantic reranker for improving search results quality."""
 
@@ -10,24 +30,37 @@ class SemanticReranker:
         self,
         model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
         enabled: bool = False,
+        batch_size: int = 64,
+        score_cache_size: int = 10_000,
     ):
         """Initialize the semantic reranker.
 
         Args:
             model_name: Cross-encoder model for reranking
             enabled: Whether reranking is enabled
+            batch_size: Query-document pairs scored per forward pass
+            score_cache_size: Number of query-document scores kept in memory
+                (0 disables)
         """
         self.enabled = enabled
         self.model_name = model_name
+        self.batch_size = batch_size
         self.cross_encoder: Optional[CrossEncoder] = None
 
+        # A pair's score depends only on the model and the two texts, so
+        # entries stay valid however the store changes
+        self._score_cache: Optional[LRUCache] = (
+            LRUCache(maxsize=score_cache_size) if score_cache_size > 0 else None
+        )
+        self._score_lock = threading.Lock()
+
         if self.enabled:
             self._load_model()
 
     def _load_model(self) -> None:
         """Load the cross-encoder model."""
         try:
-            self.cross_encoder = CrossEncoder(self.model_name)
+            self.cross_encoder = _load_cross_encoder(self.model_name)
         except Exception as e:
             print(f"Warning: Failed to load reranker model {self.model_name}: {e}")
             self.enabled = False
@@ -49,19 +82,11 @@ class SemanticReranker:
             return documents[:top_k] if top_k else documents
 
         try:
-            # Prepare query-document pairs
-            pairs = [(query, doc.page_content) for doc in documents]
-
             # Get relevance scores
-            scores = self.cross_encoder.predict(pairs)
-
-            # Combine documents with scores and sort
-            doc_scores = list(zip(documents, scores))
-            doc_scores.sort(key=lambda x: x[1], reverse=True)
+            scores = self._score(query, documents)
 
             # Return top-k documents
-            ranked_docs = [doc for doc, _ in doc_scores]
-            return ranked_docs[:top_k] if top_k else ranked_docs
+            return [doc for doc, _ in self._rank(documents, scores, top_k)]
 
         except Exception as e:
             print(f"Warning: Reranking failed: {e}")
@@ -77,13 +102,8 @@ class SemanticReranker:
             ]
 
         try:
-            pairs = [(query, doc.page_content) for doc in documents]
-            scores = self.cross_encoder.predict(pairs)
-
-            doc_scores = list(zip(documents, scores))
-            doc_scores.sort(key=lambda x: x[1], reverse=True)
-
-            return doc_scores[:top_k] if top_k else doc_scores
+            scores = self._score(query, documents)
+            return self._rank(documents, scores, top_k)
 
         except Exception as e:
             print(f"Warning: Reranking failed: {e}")
@@ -91,6 +111,47 @@ class SemanticReranker:
                 (doc, 0.0) for doc in documents[: top_k if top_k else len(documents)]
             ]
 
+    def _score(self, query: str, documents: List[Document]) -> List[float]:
+        """Score query-document pairs, running the cross-encoder only for unseen pairs."""
+        keys = [self._pair_key(query, doc.page_content) for doc in documents]
+        scores = {}
+        if self._score_cache is not None:
+            with self._score_lock:
+                scores = {key: self._score_cache[key] for key in keys if key in self._score_cache}
+
+        pending = {
+            key: doc.page_content for key, doc in zip(keys, documents) if key not in scores
+        }
+        if pending:
+            new_scores = self.cross_encoder.predict(
+                [(query, content) for content in pending.values()],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            ).tolist()
+            scores.update(zip(pending, new_scores))
+            if self._score_cache is not None:
+                with self._score_lock:
+                    self._score_cache.update(zip(pending, new_scores))
+
+        return [scores[key] for key in keys]
+
+    @staticmethod
+    def _pair_key(query: str, content: str) -> bytes:
+        """Fixed-size cache key for a query-document pair."""
+        return hashlib.sha256(f"{query}\0{content}".encode("utf-8")).digest()
+
+    @staticmethod
+    def _rank(
+        documents: List[Document], scores: List[float], top_k: Optional[int]
+    ) -> List[Tuple[Document, float]]:
+        """Pair documents with scores, best first, keeping the top_k."""
+        doc_scores = zip(documents, scores)
+        if top_k:
+            # Partial selection instead of sorting every candidate
+            return heapq.nlargest(top_k, doc_scores, key=itemgetter(1))
+        return sorted(doc_scores, key=itemgetter(1), reverse=True)
+
     def enable_reranking(self) -> None:
         """Enable reranking functionality."""
         if not self.enabled:
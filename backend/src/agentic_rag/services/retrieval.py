@@ -1,10 +1,41 @@
-from typing import List, Optional, Tuple
+import threading
+from typing import Iterator, List, Optional, Tuple
+from cachetools import TTLCache
 from langchain.schema import Document
 
 from .vector_store import VectorStoreManager
 from .reranker import SemanticReranker
 
 
+def _normalize_query(query: str) -> str:
+    """Collapse whitespace so trivially different queries share a cache entry.
+
+    The tokenizer ignores whitespace runs, so these queries embed identically.
+    """
+    return " ".join(query.split())
+
+
+# Common metadata left out of the context string
+_CONTEXT_EXCLUDED_METADATA = frozenset({"source", "page"})
+
+
+def _iter_contents(documents: List[Document], include_metadata: bool) -> Iterator[str]:
+    """Yield each document's content, prefixed with its metadata if requested."""
+    for doc in documents:
+        content = doc.page_content
+
+        if include_metadata and doc.metadata:
+            metadata_str = ", ".join(
+                f"{k}: {v}"
+                for k, v in doc.metadata.items()
+                if k not in _CONTEXT_EXCLUDED_METADATA
+            )
+            if metadata_str:
+                content = f"[{metadata_str}]\n{content}"
+
+        yield content
+
+
 class RetrievalService:
     """Service for retrieving relevant documents from vector store."""
 
@@ -14,6 +45,10 @@ class RetrievalService:
         embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
         enable_reranker: bool = False,
         reranker_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        query_cache_size: int = 1024,
+        results_cache_size: int = 10_000,
+        results_cache_ttl: float = 60,
+        hnsw_config: Optional[dict] = None,
     ):
         """Initialize the retrieval service.
 
@@ -22,15 +57,37 @@ class RetrievalService:
             embedding_model: Embedding model to use
             enable_reranker: Whether to enable semantic reranking
             reranker_model: Cross-encoder model for reranking
+            query_cache_size: Number of query embeddings kept in memory (0 disables)
+            results_cache_size: Number of unfiltered retrieval results kept in
+                memory (0 disables)
+            results_cache_ttl: Seconds a cached result is reused; writes from
+                this process clear the cache at once, so this bounds how long
+                documents ingested by other worker processes can be missing
+            hnsw_config: HNSW index parameters for a newly created store
         """
         self.vector_store = VectorStoreManager(
-            persist_directory=vector_store_path, embedding_model=embedding_model
+            persist_directory=vector_store_path,
+            embedding_model=embedding_model,
+            query_cache_size=query_cache_size,
+            hnsw_config=hnsw_config,
         )
 
         self.reranker = SemanticReranker(
             model_name=reranker_model, enabled=enable_reranker
         )
 
+        # Latched once the store exists on disk; it is written by other
+        # VectorStoreManager instances, so only a negative check is repeated
+        self._ready = False
+
+        self._results_cache = (
+            TTLCache(maxsize=results_cache_size, ttl=results_cache_ttl)
+            if results_cache_size > 0
+            else None
+        )
+        self._results_lock = threading.Lock()
+        self._results_version = self.vector_store.store_version()
+
     def retrieve_documents(
         self,
         query: str,
@@ -53,6 +110,33 @@ class RetrievalService:
         Returns:
             List of relevant documents
         """
+        # Filtered searches are rare and their dicts aren't hashable; don't cache them
+        if self._results_cache is None or metadata_filter is not None:
+            return self._retrieve_documents(
+                query, k, use_reranker, rerank_top_k, similarity_threshold, metadata_filter
+            )
+
+        key = (_normalize_query(query), k, use_reranker, rerank_top_k, similarity_threshold)
+        version, (cached,) = self._get_cached_results([key])
+        if cached is not None:
+            return list(cached)
+
+        documents = self._retrieve_documents(
+            query, k, use_reranker, rerank_top_k, similarity_threshold, None
+        )
+        self._set_cached_results(version, [(key, documents)])
+        return list(documents)
+
+    def _retrieve_documents(
+        self,
+        query: str,
+        k: int,
+        use_reranker: Optional[bool],
+        rerank_top_k: Optional[int],
+        similarity_threshold: Optional[float],
+        metadata_filter: Optional[dict],
+    ) -> List[Document]:
+        """Run retrieval for retrieve_documents(), bypassing the results cache."""
         # Initialize vector store if needed
         if not self.vector_store.vector_store:
             self.vector_store.initialize_store()
@@ -85,11 +169,90 @@ class RetrievalService:
         else:
             # Return top k without reranking
             filtered_docs = filtered_docs[:k]
-        
-        # print(filtered_docs)
-        
+
         return filtered_docs
 
+    def retrieve_documents_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        use_reranker: bool = None,
+        metadata_filter: Optional[dict] = None,
+    ) -> List[List[Document]]:
+        """Retrieve relevant documents for several queries in one vector search.
+
+        Args:
+            queries: Search queries
+            k: Number of documents to return per query
+            use_reranker: Whether to use reranker (overrides default)
+            metadata_filter: Filter documents by metadata
+
+        Returns:
+            One list of relevant documents per query, in query order
+        """
+        if self._results_cache is None or metadata_filter is not None:
+            return self._retrieve_documents_batch(queries, k, use_reranker, metadata_filter)
+
+        # Same keys as retrieve_documents(), so both paths share cached results
+        keys = [(_normalize_query(query), k, use_reranker, None, None) for query in queries]
+        version, results = self._get_cached_results(keys)
+
+        missing = [i for i, docs in enumerate(results) if docs is None]
+        if missing:
+            fetched = self._retrieve_documents_batch(
+                [queries[i] for i in missing], k, use_reranker, None
+            )
+            for i, docs in zip(missing, fetched):
+                results[i] = docs
+            self._set_cached_results(version, [(keys[i], results[i]) for i in missing])
+
+        return [list(docs) for docs in results]
+
+    def _get_cached_results(self, keys: List[tuple]) -> Tuple[int, List[Optional[List[Document]]]]:
+        """Look up cached results, first dropping them all if the store was written to.
+
+        Returns the store version the lookup was made at, for _set_cached_results().
+        """
+        with self._results_lock:
+            version = self.vector_store.store_version()
+            if version != self._results_version:
+                self._results_cache.clear()
+                self._results_version = version
+            return version, [self._results_cache.get(key) for key in keys]
+
+    def _set_cached_results(self, version: int, items: List[Tuple[tuple, List[Document]]]) -> None:
+        """Cache results unless the store was written to while they were fetched."""
+        with self._results_lock:
+            if version != self.vector_store.store_version():
+                return
+            for key, documents in items:
+                self._results_cache[key] = documents
+
+    def _retrieve_documents_batch(
+        self,
+        queries: List[str],
+        k: int,
+        use_reranker: Optional[bool],
+        metadata_filter: Optional[dict],
+    ) -> List[List[Document]]:
+        """Run retrieval for retrieve_documents_batch(), bypassing the results cache."""
+        if not self.vector_store.vector_store:
+            self.vector_store.initialize_store()
+
+        rerank = use_reranker or (use_reranker is None and self.reranker.enabled)
+        initial_k = k * 2 if rerank else k
+
+        batch_docs = self.vector_store.similarity_search_batch(
+            queries=queries, k=initial_k, filter_dict=metadata_filter
+        )
+
+        if rerank:
+            return [
+                self.reranker.rerank_documents(query=query, documents=docs, top_k=k)
+                for query, docs in zip(queries, batch_docs)
+            ]
+        return [docs[:k] for docs in batch_docs]
+
     def retrieve_with_scores(
         self,
         query: str,
@@ -151,29 +314,46 @@ class RetrievalService:
             Combined context string
         """
         documents = self.retrieve_documents(query=query, k=k, **kwargs)
+        return self.format_context(
+            documents, separator=separator, include_metadata=include_metadata
+        )
+
+    @staticmethod
+    def format_context(
+        documents: List[Document],
+        separator: str = "\n\n---\n\n",
+        include_metadata: bool = False,
+    ) -> str:
+        """Join already retrieved documents into a single context string.
+
+        Args:
+            documents: Documents to combine
+            separator: Separator between documents
+            include_metadata: Whether to include document metadata
 
-        context_parts = []
-        for i, doc in enumerate(documents):
-            content = doc.page_content
+        Returns:
+            Combined context string
+        """
+        return separator.join(_iter_contents(documents, include_metadata))
 
-            if include_metadata and doc.metadata:
-                metadata_str = ", ".join(
-                    [
-                        f"{k}: {v}"
-                        for k, v in doc.metadata.items()
-                        if k not in ["source", "page"]  # Common metadata to exclude
-                    ]
-                )
-                if metadata_str:
-                    content = f"[{metadata_str}]\n{content}"
+    def warm_up(self) -> None:
+        """Open the store and run a throwaway query so the first request is fast.
 
-            context_parts.append(content)
+        Forces the embedding model's first forward pass, the Chroma client and
+        (when enabled) the reranker to initialize ahead of real traffic.
+        """
+        if not self.vector_store.vector_store:
+            self.vector_store.initialize_store()
 
-        return separator.join(context_parts)
+        self.vector_store.embeddings.embed_query("warmup")
+        if self.is_store_ready():
+            self.retrieve_documents("warmup", k=1)
 
     def is_store_ready(self) -> bool:
         """Check if the vector store is ready for retrieval."""
-        return self.vector_store._store_exists()
+        if not self._ready:
+            self._ready = self.vector_store._store_exists()
+        return self._ready
 
     def get_store_info(self) -> dict:
         """Get information about the vector store."""
@@ -1,9 +1,53 @@
+import logging
+import time
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
+import torch
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.schema import Document
 
+from .embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    QueryCachedEmbeddings,
+    embed_queries,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bumped on every write to a store directory, so readers in this process can
+# tell when results they cached may be out of date
+_store_versions: Counter = Counter()
+
+
+@lru_cache(maxsize=None)
+def _load_embeddings(model_name: str) -> HuggingFaceEmbeddings:
+    """Load an embedding model once per process.
+
+    The ingestion pipeline and the retrieval service each own a
+    VectorStoreManager; sharing the model keeps one copy of its weights in
+    memory instead of one per manager.
+    """
+    # Encode on the GPU when there is one; the cross-encoder picks its
+    # device the same way
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": device})
+
+
+def _embeddings_with_batch_size(model_name: str, batch_size: int) -> HuggingFaceEmbeddings:
+    """Return the shared model configured to encode in batches of batch_size.
+
+    The copy is shallow, so it shares the loaded model and only its encode
+    settings differ; managers with different batch sizes don't reload weights.
+    """
+    embeddings = _load_embeddings(model_name)
+    return embeddings.model_copy(
+        update={"encode_kwargs": {**embeddings.encode_kwargs, "batch_size": batch_size}}
+    )
+
 
 class VectorStoreManager:
     """Manages the local vector store for document embeddings."""
@@ -12,43 +56,74 @@ class VectorStoreManager:
         self,
         persist_directory: str = "./vector_store",
         embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        embedding_batch_size: int = 128,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        query_cache_size: int = 0,
+        hnsw_config: Optional[dict] = None,
     ):
         """Initialize the vector store manager.
 
         Args:
             persist_directory: Directory to persist the vector store
             embedding_model: HuggingFace embedding model to use
+            embedding_batch_size: Number of chunks embedded per model call
+            embedding_cache: Optional persistent cache of document embeddings
+            query_cache_size: Number of query embeddings kept in memory (0 disables)
+            hnsw_config: Chroma HNSW index parameters (max_neighbors,
+                ef_construction, ef_search); only applied when the
+                collection is created, existing stores keep their own
         """
         self.persist_directory = Path(persist_directory)
         self.persist_directory.mkdir(parents=True, exist_ok=True)
+        self.embedding_batch_size = embedding_batch_size
+        self.hnsw_config = hnsw_config
 
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=embedding_model, model_kwargs={"device": "cpu"}
-        )
+        self.embeddings = _embeddings_with_batch_size(embedding_model, embedding_batch_size)
+        if embedding_cache is not None:
+            self.embeddings = CachedEmbeddings(
+                self.embeddings, embedding_cache, model_name=embedding_model
+            )
+        if query_cache_size > 0:
+            self.embeddings = QueryCachedEmbeddings(self.embeddings, maxsize=query_cache_size)
 
         self.vector_store: Optional[Chroma] = None
 
     def initialize_store(self) -> None:
         """Initialize or load existing vector store."""
-        if self._store_exists():
-            self.vector_store = Chroma(
-                persist_directory=str(self.persist_directory),
-                embedding_function=self.embeddings,
-            )
-        else:
-            self.vector_store = Chroma(
-                persist_directory=str(self.persist_directory),
-                embedding_function=self.embeddings,
-            )
+        # Chroma opens an existing collection or creates an empty one
+        self.vector_store = Chroma(
+            persist_directory=str(self.persist_directory),
+            embedding_function=self.embeddings,
+            collection_configuration=(
+                {"hnsw": self.hnsw_config} if self.hnsw_config else None
+            ),
+        )
 
     def add_documents(self, documents: List[Document]) -> None:
-        """Add documents to the vector store."""
+        """Add documents to the vector store in as few writes as Chroma accepts."""
         if not self.vector_store:
             self.initialize_store()
 
         if documents:
-            self.vector_store.add_documents(documents)
+            batch_size = self.embedding_batch_size
+            started = time.perf_counter()
+            # The model already encodes in embedding_batch_size batches, so each
+            # slice here is one upsert (one SQLite transaction and index update)
+            write_size = self.vector_store._client.get_max_batch_size()
+            for start in range(0, len(documents), write_size):
+                self.vector_store.add_documents(documents[start : start + write_size])
             self.persist()
+            _store_versions[self._version_key] += 1
+
+            # Throughput report for tuning embedding_batch_size
+            elapsed = time.perf_counter() - started
+            logger.debug(
+                "Stored %d chunks in %.2fs (%.1f chunks/s, batch size %d)",
+                len(documents),
+                elapsed,
+                len(documents) / max(elapsed, 1e-9),
+                batch_size,
+            )
 
     def persist(self) -> None:
         """Persist the vector store to disk."""
@@ -64,6 +139,34 @@ class VectorStoreManager:
 
         return self.vector_store.similarity_search(query=query, k=k, filter=filter_dict)
 
+    def similarity_search_batch(
+        self, queries: List[str], k: int = 4, filter_dict: Optional[dict] = None
+    ) -> List[List[Document]]:
+        """Search for similar documents for several queries at once.
+
+        The queries are embedded together and sent to Chroma as one query.
+        """
+        if not self.vector_store:
+            self.initialize_store()
+        if not queries:
+            return []
+
+        results = self.vector_store._collection.query(
+            query_embeddings=embed_queries(self.embeddings, queries),
+            n_results=k,
+            where=filter_dict,
+            include=["documents", "metadatas"],
+        )
+        return [
+            [
+                Document(page_content=content, metadata=metadata or {}, id=doc_id)
+                for content, metadata, doc_id in zip(contents, metadatas, ids)
+            ]
+            for contents, metadatas, ids in zip(
+                results["documents"], results["metadatas"], results["ids"]
+            )
+        ]
+
     def similarity_search_with_score(
         self, query: str, k: int = 4, filter_dict: Optional[dict] = None
     ) -> List[tuple[Document, float]]:
@@ -98,3 +201,12 @@ class VectorStoreManager:
 
             shutil.rmtree(self.persist_directory)
             self.persist_directory.mkdir(parents=True, exist_ok=True)
+        _store_versions[self._version_key] += 1
+
+    @property
+    def _version_key(self) -> str:
+        return str(self.persist_directory.resolve())
+
+    def store_version(self) -> int:
+        """Count of writes to this store directory made from this process."""
+        return _store_versions[self._version_key]